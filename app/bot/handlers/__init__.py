@@ -1,5 +1,6 @@
 from .auth import router as auth_router
 from .tx import router as balance_router
+from .tx import statement_router
 from .commands import router as command_router
 from .groups import router as group_chat_router
 from .role import *
@@ -4,8 +4,8 @@ from aiogram import Router, filters, types, F
 
 from app.models import Actions, ActionCategory, AuthActions
 from app.repo import AdminRepository
-from app.repo import AuditLogRepository, UserRepository
-from app.services import get_login_code_cache
+from app.repo import UserRepository
+from app.services import get_login_code_cache, get_audit_log_writer
 from app.utils.translations import format_code_info, t, get_user_language
 
 router = Router()
@@ -15,7 +15,6 @@ logger = logging.getLogger(__name__)
 @router.message(filters.Command('login'))
 async def login_handler(
         message: types.Message,
-        log_repo: AuditLogRepository,
         user_repo: UserRepository,
         admin_repo: AdminRepository
 ):
@@ -56,7 +55,7 @@ async def login_handler(
                 name=AuthActions.CREATED_OTP
             )
 
-            log_repo.create(
+            get_audit_log_writer().log(
                 user=user,
                 action=action,
                 payload={
@@ -89,7 +88,7 @@ async def login_handler(
                 name=AuthActions.CREATED_OTP
             )
 
-            log_repo.create(
+            get_audit_log_writer().log(
                 user=user,
                 action=action,
                 payload={
@@ -10,8 +10,9 @@ from app.bot.utils import (
 )
 from app.models import Actions, ActionCategory, GroupActions
 from app.repo import (
-    GroupRepository, AdminRepository, AuditLogRepository,
+    GroupRepository, AdminRepository,
 )
+from app.services import get_audit_log_writer
 from app.utils.translations import t
 
 router = Router()
@@ -26,8 +27,7 @@ logger = logging.getLogger(__name__)
 async def bot_added_to_group(
         event: types.ChatMemberUpdated,
         group_repo: GroupRepository,
-        admin_repo: AdminRepository,
-        log_repo: AuditLogRepository
+        admin_repo: AdminRepository
 ):
     chat = event.chat
 
@@ -47,7 +47,7 @@ async def bot_added_to_group(
         name=GroupActions.ADDED
     )
 
-    log_repo.create(
+    get_audit_log_writer().log(
         admin=adder,
         action=action,
         payload={
@@ -109,8 +109,7 @@ async def bot_added_to_group(
 async def bot_removed_from_group(
         event: types.ChatMemberUpdated,
         group_repo: GroupRepository,
-        admin_repo: AdminRepository,
-        log_repo: AuditLogRepository
+        admin_repo: AdminRepository
 ):
     chat = event.chat
 
@@ -127,7 +126,7 @@ async def bot_removed_from_group(
             name=GroupActions.KICKED
         )
 
-        log_repo.create(
+        get_audit_log_writer().log(
             admin=kicker,
             action=action,
             payload={
@@ -6,8 +6,9 @@ from app.models import GroupRole, Actions, ActionCategory, GroupActions
 from app.repo import (
     UserRepository,
     GroupRepository,
-    GroupUserRepository, AuditLogRepository, AdminRepository,
+    GroupUserRepository, AdminRepository,
 )
+from app.services import get_audit_log_writer
 from app.utils import require_admin
 from app.utils.translations import get_user_language, t, format_role_message
 
@@ -23,8 +24,7 @@ async def set_role_handler(
         user_repo: UserRepository,
         admin_repo: AdminRepository,
         group_repo: GroupRepository,
-        group_user_repo: GroupUserRepository,
-        log_repo: AuditLogRepository
+        group_user_repo: GroupUserRepository
 ):
     admin_user = user_repo.get_by_telegram_id(message.from_user.id)
     lang = get_user_language(admin_user)
@@ -83,7 +83,7 @@ async def set_role_handler(
             name=GroupActions.ASSIGNED
         )
 
-        log_repo.create(
+        get_audit_log_writer().log(
             user=target_user,
             admin=promoter,
             action=action,
@@ -120,8 +120,7 @@ async def rm_role_handler(
         user_repo: UserRepository,
         admin_repo: AdminRepository,
         group_repo: GroupRepository,
-        group_user_repo: GroupUserRepository,
-        log_repo: AuditLogRepository
+        group_user_repo: GroupUserRepository
 ):
     admin_user = user_repo.get_by_telegram_id(message.from_user.id)
     lang = get_user_language(admin_user)
@@ -175,7 +174,7 @@ async def rm_role_handler(
             name=GroupActions.UNASSIGNED
         )
 
-        log_repo.create(
+        get_audit_log_writer().log(
             user=target_user,
             admin=promoter,
             action=action,
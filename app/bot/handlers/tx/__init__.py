@@ -1 +1,2 @@
 from .command_handler import router
+from .statement_handler import router as statement_router
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from aiogram import Router, filters, types
+from aiogram.types import BufferedInputFile
+
+from app.core.configs import settings
+from app.db import get_db_session
+from app.repo import BankAccountRepository, CompanyGroupRepository, CompanyRepository, GroupRepository, UserRepository
+from app.utils.statement_export import STATEMENT_FORMATS, iter_statement_csv, statement_filename, write_statement_xlsx
+from app.utils.translations import t, get_user_language
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATEMENT_DAYS = 30
+MAX_STATEMENT_DAYS = 366
+
+
+def _parse_args(args: Optional[str]) -> Optional[tuple[int, str]]:
+    days, file_format = DEFAULT_STATEMENT_DAYS, STATEMENT_FORMATS[0]
+
+    for arg in (args or "").lower().split():
+        if arg in STATEMENT_FORMATS:
+            file_format = arg
+        elif arg.isdigit() and 0 < int(arg) <= MAX_STATEMENT_DAYS:
+            days = int(arg)
+        else:
+            return None
+
+    return days, file_format
+
+
+def _export_company_statement(company_id: uuid.UUID, days: int, file_format: str) -> Optional[dict]:
+    with get_db_session() as db:
+        company = CompanyRepository(db).get_by_id(company_id)
+        bank_accounts = BankAccountRepository(db).get_by_company_id(company_id)
+
+        if not company or not bank_accounts:
+            return None
+
+        date_to = datetime.now(ZoneInfo(settings.TIMEZONE)).date()
+        date_from = date_to - timedelta(days=days - 1)
+        filename = statement_filename(company.name, date_from, date_to, file_format)
+
+        if file_format == "csv":
+            content = "".join(iter_statement_csv(db, company.name, bank_accounts, date_from, date_to)).encode()
+        else:
+            with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+                write_statement_xlsx(db, company.name, bank_accounts, date_from, date_to, output)
+                output.seek(0)
+                content = output.read()
+
+        return {
+            "content": content,
+            "filename": filename,
+            "company": company.name,
+            "date_from": date_from.strftime("%d.%m.%Y"),
+            "date_to": date_to.strftime("%d.%m.%Y"),
+        }
+
+
+@router.message(filters.Command("statement"))
+async def get_statement(message: types.Message, command: filters.CommandObject, user_repo: UserRepository):
+    user = user_repo.get_by_telegram_id(message.from_user.id)
+    lang = get_user_language(user)
+
+    parsed = _parse_args(command.args)
+    if parsed is None:
+        await message.answer(t("statement_usage", lang, max_days=MAX_STATEMENT_DAYS))
+        return
+
+    days, file_format = parsed
+
+    try:
+        with get_db_session() as db:
+            group = GroupRepository(db).get_by_telegram_id(message.chat.id)
+
+            if not group:
+                await message.answer(t("bot_not_added", lang))
+                return
+
+            company_ids = [cg.company_id for cg in CompanyGroupRepository(db).get_by_group_id(group.id)]
+
+        if not company_ids:
+            await message.answer(t("group_not_linked", lang))
+            return
+
+        sent = 0
+        for company_id in company_ids:
+            # the export reads the database and writes the file, keep it off the event loop
+            result = await asyncio.to_thread(_export_company_statement, company_id, days, file_format)
+            if result is None:
+                continue
+
+            await message.answer_document(
+                BufferedInputFile(file=result["content"], filename=result["filename"]),
+                caption=t(
+                    "statement_caption",
+                    lang,
+                    company=result["company"],
+                    date_from=result["date_from"],
+                    date_to=result["date_to"],
+                ),
+                parse_mode="HTML",
+            )
+            sent += 1
+
+        if sent == 0:
+            await message.answer(t("no_bank_accounts", lang))
+
+    except Exception as e:
+        logger.error(f"Critical error in statement command: {e}", exc_info=True)
+        await message.answer(t("general_error", lang))
+
+
+__all__ = ['router']
@@ -1,16 +1,67 @@
+import logging
+from typing import Optional
+
 from app.models import Transaction
 from app.utils.translations import t
 
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def _telegram_length(text: str) -> int:
+    # Telegram counts UTF-16 code units; tags are counted too, which only errs on the safe side
+    return len(text.encode("utf-16-le")) // 2
+
+
+def pack_message_groups(parts: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[list[int]]:
+    """
+    Indices of the parts that go into each message, as few messages as
+    possible under ``limit``. Parts are never split, so each message ends on
+    a transaction boundary.
+    """
+    groups = []
+    current, current_length = [], 0
+
+    for idx, part in enumerate(parts):
+        length = _telegram_length(part)
+
+        if current and current_length + length > limit:
+            groups.append(current)
+            current, current_length = [], 0
+
+        if length > limit:
+            logger.warning(f"Message part of {length} characters exceeds the Telegram limit of {limit}")
+
+        current.append(idx)
+        current_length += length
+
+    if current:
+        groups.append(current)
+
+    return groups
+
+
+def pack_messages(parts: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """Join formatted parts into as few messages as possible under ``limit``."""
+    return ["".join(parts[idx] for idx in group).rstrip() for group in pack_message_groups(parts, limit)]
+
 
-def format_transactions(transactions: list[Transaction], lang: str) -> list[str]:
+def format_transactions(
+        transactions: list[Transaction],
+        lang: str,
+        directions: Optional[dict] = None
+) -> list[str]:
+    """``directions`` overrides the stored direction by transaction id, e.g. for the counterparty's side."""
+    directions = directions or {}
     return [
         msg for i, transaction in enumerate(transactions, 1)
-        if (msg := format_transaction(transaction, order=i, lang=lang)) is not None
+        if (msg := format_transaction(transaction, order=i, lang=lang, direction=directions.get(transaction.id))) is not None
     ]
 
 
-def format_transaction(transaction: Transaction, lang: str, order: int = 1, ) -> str | None:
-    direction = transaction.direction
+def format_transaction(transaction: Transaction, lang: str, order: int = 1, direction: Optional[str] = None) -> str | None:
+    direction = direction or transaction.direction
     if not direction or direction.lower() not in ("in", "out"):
         return None
 
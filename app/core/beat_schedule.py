@@ -36,6 +36,14 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(hour=2, minute=0),
         'kwargs': {'days': 30, 'batch_size': 1000}
     },
+    'purge_transaction_notifications': {
+        'task': 'app.core.tasks.send_tasks.purge_transaction_notifications',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'maintain_partitions': {
+        'task': 'app.core.tasks.partition_tasks.maintain_partitions',
+        'schedule': crontab(hour=1, minute=0),
+    },
     'send_daily_reports': {
         'task': 'app.core.tasks.send_tasks.send_daily_reports',
         'schedule': crontab(hour=18, minute=0),
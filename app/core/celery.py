@@ -1,11 +1,16 @@
 import asyncio
 import logging
+import threading
 from functools import wraps
 
 from celery import Celery
-from celery.signals import worker_process_init
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready, worker_shutdown
 
 from app.core.configs import settings
+from app.core.http import close_http_client
+from app.core.process_pool import shutdown_process_pool
+from app.core.redis import close_async_redis_client
+from app.core.telegram import close_bot
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +22,7 @@ celery_app = Celery(
         "app.core.tasks.fetch_tasks",
         "app.core.tasks.send_tasks",
         "app.core.tasks.delete_logs",
+        "app.core.tasks.partition_tasks",
     ],
 )
 
@@ -40,25 +46,114 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    task_routes={
+        "app.core.tasks.fetch_tasks.sync_company_accounts_batch": {"queue": settings.SYNC_QUEUE},
+        "app.core.tasks.fetch_tasks.sync_company_transactions_batch": {"queue": settings.SYNC_QUEUE},
+        "app.core.tasks.send_tasks.single_company_daily_report": {"queue": settings.REPORT_QUEUE},
+    },
 )
 
 
+_worker_loops = threading.local()
+
+# loops of every worker thread, so the threads pool can close them at shutdown
+_all_worker_loops: set[asyncio.AbstractEventLoop] = set()
+_all_worker_loops_lock = threading.Lock()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop of the current worker thread.
+
+    Pooled clients (HTTP, async Redis, bot) are kept per loop, so every async
+    task in a worker thread runs on the same loop and reuses them.
+    """
+    loop = getattr(_worker_loops, "loop", None)
+
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _worker_loops.loop = loop
+        with _all_worker_loops_lock:
+            _all_worker_loops.add(loop)
+
+    return loop
+
+
+def _close_loop(loop: asyncio.AbstractEventLoop) -> None:
+    with _all_worker_loops_lock:
+        _all_worker_loops.discard(loop)
+
+    if loop.is_closed():
+        return
+
+    try:
+        loop.run_until_complete(close_bot())
+        loop.run_until_complete(close_http_client())
+        loop.run_until_complete(close_async_redis_client())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+        logger.info("Worker event loop closed")
+
+
+def close_worker_loop() -> None:
+    loop = getattr(_worker_loops, "loop", None)
+    _worker_loops.loop = None
+
+    if loop is None:
+        return
+
+    try:
+        _close_loop(loop)
+    finally:
+        asyncio.set_event_loop(None)
+
+
+def close_all_worker_loops() -> None:
+    """Close the loops of all worker threads; their tasks must have finished."""
+    with _all_worker_loops_lock:
+        loops = list(_all_worker_loops)
+
+    for loop in loops:
+        try:
+            _close_loop(loop)
+        except Exception as e:
+            logger.warning(f"Failed to close worker event loop: {e}")
+
+
 @worker_process_init.connect
 def init_worker(**kwargs):
     from app.utils.translations import initialize_translator, MESSAGES
     initialize_translator(MESSAGES)
     logger.info("Translator initialized in Celery worker")
 
+    get_worker_loop()
+    logger.info("Worker event loop created")
+
+
+@worker_ready.connect
+def ensure_partitions_on_startup(sender=None, **kwargs):
+    # make sure partitions exist before the first insert, without waiting for beat
+    celery_app.send_task("app.core.tasks.partition_tasks.maintain_partitions")
+
+
+@worker_process_shutdown.connect
+def shutdown_worker(**kwargs):
+    close_worker_loop()
+
+
+@worker_shutdown.connect
+def shutdown_worker_pool(**kwargs):
+    # worker_process_shutdown doesn't fire for the threads pool, its loops are closed here
+    close_all_worker_loops()
+    shutdown_process_pool()
+
 
 def async_task(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(func(*args, **kwargs))
-        finally:
-            loop.close()
+        return get_worker_loop().run_until_complete(func(*args, **kwargs))
 
     return wrapper
 
@@ -67,4 +162,5 @@ celery_app.autodiscover_tasks([
     'app.core.tasks.fetch_tasks',
     'app.core.tasks.send_tasks',
     'app.core.tasks.delete_logs',
+    'app.core.tasks.partition_tasks',
 ], force=True)
@@ -19,6 +19,27 @@ class Settings:
         self.KAPITALBANK_URL = os.getenv("KAPITALBANK_URL")
         self.IPAK_YULI_URL = os.getenv("IPAK_YULI_URL")
 
+        self.KAPITALBANK_CONCURRENCY = int(os.getenv("KAPITALBANK_CONCURRENCY", "5"))
+        self.KAPITALBANK_RATE_LIMIT = float(os.getenv("KAPITALBANK_RATE_LIMIT", "20"))
+        self.KAPITALBANK_RATE_BURST = int(os.getenv("KAPITALBANK_RATE_BURST", "40"))
+        self.KAPITALBANK_BUSINESS_RATE_LIMIT = float(os.getenv("KAPITALBANK_BUSINESS_RATE_LIMIT", "2"))
+        self.KAPITALBANK_BUSINESS_RATE_BURST = int(os.getenv("KAPITALBANK_BUSINESS_RATE_BURST", "5"))
+        self.KAPITALBANK_MAX_RETRIES = int(os.getenv("KAPITALBANK_MAX_RETRIES", "3"))
+        self.KAPITALBANK_TOKEN_TTL = int(os.getenv("KAPITALBANK_TOKEN_TTL", str(12 * 60 * 60)))
+        self.KAPITALBANK_TOKEN_REFRESH_MARGIN = int(os.getenv("KAPITALBANK_TOKEN_REFRESH_MARGIN", str(2 * 60 * 60)))
+        self.KAPITALBANK_REFRESH_LOCK_TIMEOUT = int(os.getenv("KAPITALBANK_REFRESH_LOCK_TIMEOUT", "60"))
+        self.KAPITALBANK_REFRESH_RETRY_INTERVAL = int(os.getenv("KAPITALBANK_REFRESH_RETRY_INTERVAL", "600"))
+        self.KAPITALBANK_CACHE_TTL = int(os.getenv("KAPITALBANK_CACHE_TTL", "300"))
+        self.KAPITALBANK_PENDING_MAX_ATTEMPTS = int(os.getenv("KAPITALBANK_PENDING_MAX_ATTEMPTS", "72"))
+        self.TRANSACTION_BATCH_SIZE = int(os.getenv("TRANSACTION_BATCH_SIZE", "50"))
+
+        self.HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "30"))
+        self.HTTP_CLIENT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "10"))
+        self.HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+        self.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "60"))
+        self.HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "false").lower() in ("true", "1", "yes")
+
         self.HEADLESS = os.getenv("HEADLESS", "false").lower() in ("true", "1", "yes")
 
         self.POSTGRES_DB = os.getenv("POSTGRES_DB")
@@ -27,6 +48,7 @@ class Settings:
         self.POSTGRES_USER = os.getenv("POSTGRES_USER")
         self.POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
         self.POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "10"))
+        self.POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "20"))
 
         self.DATABASE_URL = f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
@@ -35,9 +57,31 @@ class Settings:
         self.REDIS_PORT = os.getenv("REDIS_PORT")
         self.REDIS_DB = os.getenv("REDIS_DB")
         self.REDIS_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+        self.REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
         self.CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
         self.CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 
+        self.DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "500"))
+        self.TRANSACTION_PARTITIONS_AHEAD = int(os.getenv("TRANSACTION_PARTITIONS_AHEAD", "3"))
+        self.TRANSACTION_RETENTION_MONTHS = int(os.getenv("TRANSACTION_RETENTION_MONTHS", "0"))
+        self.AUDIT_LOG_PARTITION_INTERVAL = os.getenv("AUDIT_LOG_PARTITION_INTERVAL", "week").lower()
+        self.AUDIT_LOG_PARTITIONS_AHEAD = int(os.getenv("AUDIT_LOG_PARTITIONS_AHEAD", "4"))
+        self.PARTITION_ARCHIVE = os.getenv("PARTITION_ARCHIVE", "true").lower() in ("true", "1", "yes")
+        self.AUDIT_LOG_PARTITION_ARCHIVE = os.getenv("AUDIT_LOG_PARTITION_ARCHIVE", "false").lower() in ("true", "1", "yes")
+
+        self.AUDIT_LOG_SYNC = os.getenv("AUDIT_LOG_SYNC", "false").lower() in ("true", "1", "yes")
+        self.AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "2"))
+        self.AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "100"))
+
+        self.SYNC_MODE = os.getenv("SYNC_MODE", "prefork").lower()
+        self.SYNC_QUEUE = os.getenv("SYNC_QUEUE", "bank_sync")
+        self.SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "100"))
+        self.SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "20"))
+
+        self.REPORT_FONT_DIR = os.getenv("REPORT_FONT_DIR", "/usr/share/fonts/truetype/dejavu")
+        self.REPORT_QUEUE = os.getenv("REPORT_QUEUE", "reports")
+        self.PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
         self.LOG_DIR = Path(os.getenv("LOG_DIR", "logs"))
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
         self.LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
@@ -46,6 +90,22 @@ class Settings:
         self.WEBHOOK_PATH = os.getenv("WEBHOOK_PATH")
         self.WEBHOOK_URL = f"{self.BASE_WEBHOOK_URL}{self.WEBHOOK_PATH}"
         self.BOT_TOKEN = os.getenv("BOT_TOKEN")
+        self.TELEGRAM_API_SERVER = os.getenv("TELEGRAM_API_SERVER")
+
+        self.TELEGRAM_RATE_LIMIT = float(os.getenv("TELEGRAM_RATE_LIMIT", "25"))
+        self.TELEGRAM_RATE_BURST = int(os.getenv("TELEGRAM_RATE_BURST", "30"))
+        self.TELEGRAM_CHAT_RATE_LIMIT = float(os.getenv("TELEGRAM_CHAT_RATE_LIMIT", "1"))
+        self.TELEGRAM_CHAT_RATE_BURST = int(os.getenv("TELEGRAM_CHAT_RATE_BURST", "1"))
+        self.TELEGRAM_GROUP_RATE_LIMIT = float(os.getenv("TELEGRAM_GROUP_RATE_LIMIT", str(20 / 60)))
+        self.TELEGRAM_GROUP_RATE_BURST = int(os.getenv("TELEGRAM_GROUP_RATE_BURST", "3"))
+        self.TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "50"))
+        self.TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+        self.TELEGRAM_FILE_ID_TTL = int(os.getenv("TELEGRAM_FILE_ID_TTL", str(7 * 24 * 60 * 60)))
+
+        self.NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))
+        self.NOTIFICATION_LEASE_SECONDS = int(os.getenv("NOTIFICATION_LEASE_SECONDS", "1800"))
+        self.NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+        self.NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "7"))
 
 
         self.INN_CHECK_BASE_URL = os.getenv("INN_CHECK_BASE_URL", "https://gnk-api.didox.uz")
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+# connections are bound to the loop they were opened on, so keep one client per loop
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http2_enabled() -> bool:
+    if not settings.HTTP_CLIENT_HTTP2:
+        return False
+
+    try:
+        import h2  # noqa
+    except ImportError:
+        logger.warning("HTTP/2 requested but 'h2' package is not installed, falling back to HTTP/1.1")
+        return False
+
+    return True
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_CLIENT_TIMEOUT,
+        connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=_http2_enabled())
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Pooled HTTP client of the running event loop.
+
+    Every loop gets its own client, so worker threads that each run a loop
+    never share or replace each other's connections.
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+
+    if client is None or client.is_closed:
+        client = _create_http_client()
+        _http_clients[loop] = client
+        logger.info("✅ HTTP client pool created")
+
+    return client
+
+
+async def close_http_client() -> None:
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+
+    if client is None or client.is_closed:
+        return
+
+    await client.aclose()
+    logger.info("HTTP client pool closed")
+
+
+__all__ = [
+    "get_http_client",
+    "close_http_client",
+]
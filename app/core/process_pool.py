@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process-wide pool for CPU-bound work such as report rendering.
+
+    Daemonic processes (Celery prefork children) are not allowed to have
+    children, so there is no pool there and callers fall back to a thread.
+    Daily reports are routed to REPORT_QUEUE, whose worker runs the threads
+    pool in its main process and therefore gets a real pool.
+    """
+    global _process_pool
+
+    if multiprocessing.current_process().daemon or settings.PROCESS_POOL_WORKERS < 1:
+        return None
+
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_WORKERS)
+        logger.info(f"✅ Process pool created with {settings.PROCESS_POOL_WORKERS} workers")
+
+    return _process_pool
+
+
+async def run_cpu_bound(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run ``func`` off the event loop; arguments and result must be picklable."""
+    pool = get_process_pool()
+
+    if pool is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(pool, partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+
+    pool, _process_pool = _process_pool, None
+
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("Process pool shut down")
+
+
+__all__ = [
+    "get_process_pool",
+    "run_cpu_bound",
+    "shutdown_process_pool",
+]
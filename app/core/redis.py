@@ -1,5 +1,9 @@
-import redis
+import asyncio
 import logging
+import weakref
+
+import redis
+import redis.asyncio as aioredis
 
 from app.core.configs import settings
 
@@ -7,6 +11,11 @@ logger = logging.getLogger(__name__)
 
 _redis_client = None
 
+# one pool per event loop, connections can't be shared between loops
+_async_redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+
 
 def get_redis_client():
     global _redis_client
@@ -33,4 +42,42 @@ def get_redis_client():
     return _redis_client
 
 
-__all__ = ["get_redis_client"]
+def get_async_redis_client() -> aioredis.Redis:
+    """
+    Pooled asyncio Redis client of the running event loop.
+
+    Like the HTTP client pool, every loop gets its own pool.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+
+    if client is None:
+        pool = aioredis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            encoding="utf-8",
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+        client = aioredis.Redis(connection_pool=pool)
+        _async_redis_clients[loop] = client
+        logger.info("✅ Async Redis pool created")
+
+    return client
+
+
+async def close_async_redis_client() -> None:
+    client = _async_redis_clients.pop(asyncio.get_running_loop(), None)
+
+    if client is None:
+        return
+
+    await client.aclose()
+    await client.connection_pool.disconnect()
+    logger.info("Async Redis pool closed")
+
+
+__all__ = [
+    "get_redis_client",
+    "get_async_redis_client",
+    "close_async_redis_client",
+]
@@ -6,6 +6,7 @@ from billiard.exceptions import SoftTimeLimitExceeded
 from celery.exceptions import Retry
 
 from app.core.celery import celery_app, async_task
+from app.core.configs import settings
 from app.db import get_db_session
 from app.repo import AuditLogRepository
 
@@ -26,23 +27,35 @@ async def delete_old_logs(self, days: int = 30, batch_size: int = 1000):
 
         with get_db_session() as db:
             log_repo = AuditLogRepository(db)
+            cutoff = log_repo.retention_cutoff(days)
 
-            while True:
-                count = log_repo.delete_old_logs(days=days, batch_size=batch_size)
-                total_deleted += count
+            dropped = log_repo.drop_old_partitions(cutoff, archive=settings.AUDIT_LOG_PARTITION_ARCHIVE)
+            if dropped:
+                logger.info(f"Removed {len(dropped)} audit log partitions older than {cutoff:%Y-%m-%d}")
 
-                if count < batch_size:
-                    break
+            tables = log_repo.tables_with_old_logs(cutoff)
+            total = sum(log_repo.count_old_logs(table, cutoff) for table in tables)
+            self.update_state(state="PROGRESS", meta={"current": 0, "total": total})
 
-                logger.info(f"Deleted {count} logs in current batch. Total: {total_deleted}")
+            for table in tables:
+                while True:
+                    count = log_repo.delete_old_logs(table, cutoff, batch_size=batch_size)
+                    total_deleted += count
+                    self.update_state(state="PROGRESS", meta={"current": total_deleted, "total": total})
 
-                await asyncio.sleep(0.1)
+                    if count < batch_size:
+                        break
+
+                    logger.info(f"Deleted {count} logs from {table} in current batch. Total: {total_deleted}")
+
+                    await asyncio.sleep(0.1)
 
             logger.info(f"Successfully deleted {total_deleted} old audit logs")
 
             return {
                 "success": True,
                 "logs_deleted": total_deleted,
+                "partitions_dropped": dropped,
                 "days_retained": days,
             }
 
@@ -0,0 +1,38 @@
+import logging
+from typing import Iterable
+
+from celery import group
+
+from app.core.celery import celery_app
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch_for_companies(task, company_ids: Iterable[str]) -> dict:
+    """
+    Publish ``task(company_id)`` for every company as Celery groups of
+    DISPATCH_BATCH_SIZE messages that share a single broker producer.
+    """
+    company_ids = list(company_ids)
+    group_ids = []
+
+    with celery_app.producer_or_acquire() as producer:
+        for start in range(0, len(company_ids), settings.DISPATCH_BATCH_SIZE):
+            batch = company_ids[start:start + settings.DISPATCH_BATCH_SIZE]
+            result = group(task.s(company_id) for company_id in batch).apply_async(producer=producer)
+            group_ids.append(result.id)
+
+    logger.info(f"📤 Dispatched {task.name} for {len(company_ids)} companies in {len(group_ids)} groups")
+
+    return {
+        "success": True,
+        "total_companies": len(company_ids),
+        "tasks_dispatched": len(company_ids),
+        "group_ids": group_ids,
+    }
+
+
+__all__ = [
+    "dispatch_for_companies",
+]
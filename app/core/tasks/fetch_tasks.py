@@ -1,9 +1,14 @@
+import asyncio
 import logging
 import uuid
+from typing import Awaitable, Callable
 
+from celery import group
 from celery.exceptions import Retry
 
 from app.core.celery import celery_app, async_task
+from app.core.configs import settings
+from app.core.tasks.dispatch import dispatch_for_companies
 from app.db import get_db_session
 from app.repo import CompanyRepository
 from app.services import Kapitalbank
@@ -11,6 +16,83 @@ from app.services import Kapitalbank
 logger = logging.getLogger(__name__)
 
 
+def _raise_for_result(company_id: str, result: dict) -> None:
+    # the service reports bank and request errors in its result instead of raising;
+    # only timeouts and transport errors are worth another attempt
+    if result.get("success"):
+        return
+    message = f"Kapitalbank sync failed for company {company_id}: {result.get('message', 'unknown error')}"
+    if result.get("retryable"):
+        raise RuntimeError(message)
+    raise ValueError(message)
+
+
+async def _sync_company_accounts(company_id: str) -> None:
+    with get_db_session() as db:
+        service = Kapitalbank(uuid.UUID(company_id), db=db)
+        _raise_for_result(company_id, await service.accounts())
+
+
+async def _sync_company_transactions(company_id: str) -> None:
+    with get_db_session() as db:
+        service = Kapitalbank(uuid.UUID(company_id), db=db)
+        _raise_for_result(company_id, await service.transactions())
+
+
+def _sync_concurrency() -> int:
+    # every running company holds a DB session, so never outgrow the pool
+    return max(1, min(settings.SYNC_CONCURRENCY, settings.POSTGRES_POOL_SIZE + settings.POSTGRES_MAX_OVERFLOW))
+
+
+async def _sync_companies_concurrently(
+        company_ids: list[str],
+        sync: Callable[[str], Awaitable[None]],
+        retry_task,
+) -> dict:
+    semaphore = asyncio.Semaphore(_sync_concurrency())
+
+    async def run(company_id: str):
+        async with semaphore:
+            try:
+                await sync(company_id)
+                return company_id, None
+            except Exception as e:
+                return company_id, e
+
+    results = await asyncio.gather(*(run(company_id) for company_id in company_ids))
+
+    synced, failed, retried = [], [], []
+    for company_id, error in results:
+        if error is None:
+            synced.append(company_id)
+        elif isinstance(error, ValueError):
+            logger.error(f"ValueError for company {company_id}: {error}", exc_info=error)
+            failed.append(company_id)
+        else:
+            # hand the company over to the single-company task and its retry policy
+            logger.error(f"Error processing company {company_id}: {error}", exc_info=error)
+            retry_task.apply_async(args=(company_id,), countdown=60)
+            retried.append(company_id)
+
+    return {
+        "success": True,
+        "synced": len(synced),
+        "failed": failed,
+        "retried": retried,
+    }
+
+
+def _dispatch_batches(company_ids: list[str], batch_task) -> list[str]:
+    batches = [
+        company_ids[start:start + settings.SYNC_BATCH_SIZE]
+        for start in range(0, len(company_ids), settings.SYNC_BATCH_SIZE)
+    ]
+    result = group(batch_task.s(batch) for batch in batches).apply_async()
+    logger.info(f"📤 Dispatched {batch_task.name} for {len(company_ids)} companies in {len(batches)} batches")
+
+    return [child.id for child in result.children]
+
+
 @celery_app.task(
     name="app.core.tasks.fetch_tasks.sync_single_company_accounts",
     bind=True,
@@ -20,17 +102,14 @@ logger = logging.getLogger(__name__)
 @async_task
 async def sync_single_company_accounts(self, company_id: str):
     try:
-        with get_db_session() as db:
-            company_uuid = uuid.UUID(company_id)
-            service = Kapitalbank(company_uuid, db=db)
-            await service.accounts()
+        await _sync_company_accounts(company_id)
 
-            logger.info(f"✅ Successfully synced accounts for company {company_id}")
+        logger.info(f"✅ Successfully synced accounts for company {company_id}")
 
-            return {
-                "success": True,
-                "company_id": company_id,
-            }
+        return {
+            "success": True,
+            "company_id": company_id,
+        }
     except Retry:
         raise
     except ValueError as e:
@@ -46,50 +125,51 @@ async def sync_single_company_accounts(self, company_id: str):
         raise
 
 
-@celery_app.task(name="app.core.tasks.fetch_tasks.sync_accounts")
+@celery_app.task(name="app.core.tasks.fetch_tasks.sync_company_accounts_batch")
 @async_task
-async def sync_accounts():
+async def sync_company_accounts_batch(company_ids: list[str]):
+    result = await _sync_companies_concurrently(company_ids, _sync_company_accounts, sync_single_company_accounts)
+
+    logger.info(
+        f"✅ Synced accounts for {result['synced']}/{len(company_ids)} companies, "
+        f"failed: {len(result['failed'])}, retrying: {len(result['retried'])}"
+    )
+
+    return result
+
+
+@celery_app.task(name="app.core.tasks.fetch_tasks.sync_accounts")
+def sync_accounts():
     try:
         with get_db_session() as db:
             company_repo = CompanyRepository(db)
-            companies = company_repo.get_all(skip=0, limit=10000)
-
-            if not companies:
-                logger.warning("No companies found to process")
-                return {
-                    "success": True,
-                    "total_companies": 0,
-                    "tasks_dispatched": 0,
-                    "task_ids": [],
-                }
-
-            task_ids = []
-            for company in companies:
-                try:
-                    task = sync_single_company_accounts.delay(str(company.id))
-                    task_ids.append({
-                        "company_id": str(company.id),
-                        "company_name": company.name,
-                        "task_id": task.id,
-                    })
-                    logger.info(f"📤 Dispatched task for company {company.id} ({company.name}): {task.id}")
-                except Exception as e:
-                    logger.error(
-                        f"❌ Failed to dispatch task for company {company.id}: {e}",
-                        exc_info=True
-                    )
-
-            logger.info(
-                f"✅ sync_accounts completed. "
-                f"Total companies: {len(companies)}, Tasks dispatched: {len(task_ids)}"
-            )
+            company_ids = [str(company_id) for company_id in company_repo.get_eligible_ids(with_bank_accounts=False)]
 
+        if not company_ids:
+            logger.warning("No companies found to process")
             return {
                 "success": True,
-                "total_companies": len(companies),
+                "total_companies": 0,
+                "tasks_dispatched": 0,
+            }
+
+        if settings.SYNC_MODE == "async":
+            task_ids = _dispatch_batches(company_ids, sync_company_accounts_batch)
+            result = {
+                "success": True,
+                "total_companies": len(company_ids),
                 "tasks_dispatched": len(task_ids),
                 "task_ids": task_ids,
             }
+        else:
+            result = dispatch_for_companies(sync_single_company_accounts, company_ids)
+
+        logger.info(
+            f"✅ sync_accounts completed. "
+            f"Total companies: {result['total_companies']}, Tasks dispatched: {result['tasks_dispatched']}"
+        )
+
+        return result
     except Exception as e:
         logger.error(f"❌ Critical error in sync_accounts: {e}", exc_info=True)
         raise
@@ -104,17 +184,14 @@ async def sync_accounts():
 @async_task
 async def sync_single_company_transactions(self, company_id: str):
     try:
-        with get_db_session() as db:
-            company_uuid = uuid.UUID(company_id)
-            service = Kapitalbank(company_uuid, db=db)
-            await service.transactions()
+        await _sync_company_transactions(company_id)
 
-            logger.info(f"✅ Successfully synced transactions for company {company_id}")
+        logger.info(f"✅ Successfully synced transactions for company {company_id}")
 
-            return {
-                "success": True,
-                "company_id": company_id,
-            }
+        return {
+            "success": True,
+            "company_id": company_id,
+        }
     except Retry:
         raise
     except ValueError as e:
@@ -130,50 +207,51 @@ async def sync_single_company_transactions(self, company_id: str):
         raise
 
 
-@celery_app.task(name="app.core.tasks.fetch_tasks.sync_transactions")
+@celery_app.task(name="app.core.tasks.fetch_tasks.sync_company_transactions_batch")
 @async_task
-async def sync_transactions():
+async def sync_company_transactions_batch(company_ids: list[str]):
+    result = await _sync_companies_concurrently(company_ids, _sync_company_transactions, sync_single_company_transactions)
+
+    logger.info(
+        f"✅ Synced transactions for {result['synced']}/{len(company_ids)} companies, "
+        f"failed: {len(result['failed'])}, retrying: {len(result['retried'])}"
+    )
+
+    return result
+
+
+@celery_app.task(name="app.core.tasks.fetch_tasks.sync_transactions")
+def sync_transactions():
     try:
         with get_db_session() as db:
             company_repo = CompanyRepository(db)
-            companies = company_repo.get_all(skip=0, limit=10000)
-
-            if not companies:
-                logger.warning("No companies found to process")
-                return {
-                    "success": True,
-                    "total_companies": 0,
-                    "tasks_dispatched": 0,
-                    "task_ids": [],
-                }
-
-            task_ids = []
-            for company in companies:
-                try:
-                    task = sync_single_company_transactions.delay(str(company.id))
-                    task_ids.append({
-                        "company_id": str(company.id),
-                        "company_name": company.name,
-                        "task_id": task.id,
-                    })
-                    logger.info(f"📤 Dispatched transaction task for company {company.id} ({company.name}): {task.id}")
-                except Exception as e:
-                    logger.error(
-                        f"❌ Failed to dispatch task for company {company.id}: {e}",
-                        exc_info=True
-                    )
-
-            logger.info(
-                f"✅ sync_transactions completed. "
-                f"Total companies: {len(companies)}, Tasks dispatched: {len(task_ids)}"
-            )
+            company_ids = [str(company_id) for company_id in company_repo.get_eligible_ids(with_bank_accounts=True)]
 
+        if not company_ids:
+            logger.warning("No companies found to process")
             return {
                 "success": True,
-                "total_companies": len(companies),
+                "total_companies": 0,
+                "tasks_dispatched": 0,
+            }
+
+        if settings.SYNC_MODE == "async":
+            task_ids = _dispatch_batches(company_ids, sync_company_transactions_batch)
+            result = {
+                "success": True,
+                "total_companies": len(company_ids),
                 "tasks_dispatched": len(task_ids),
                 "task_ids": task_ids,
             }
+        else:
+            result = dispatch_for_companies(sync_single_company_transactions, company_ids)
+
+        logger.info(
+            f"✅ sync_transactions completed. "
+            f"Total companies: {result['total_companies']}, Tasks dispatched: {result['tasks_dispatched']}"
+        )
+
+        return result
     except Exception as e:
         logger.error(f"❌ Critical error in sync_transactions: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
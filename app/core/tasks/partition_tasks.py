@@ -0,0 +1,41 @@
+import logging
+from datetime import datetime, timezone
+
+from app.core.celery import celery_app
+from app.core.configs import settings
+from app.db import get_db_session
+from app.repo import PartitionManager
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.core.tasks.partition_tasks.maintain_partitions")
+def maintain_partitions():
+    try:
+        with get_db_session() as db:
+            manager = PartitionManager(db, "transactions", interval="month")
+            created = manager.ensure_partitions(ahead=settings.TRANSACTION_PARTITIONS_AHEAD)
+
+            detached = []
+            if settings.TRANSACTION_RETENTION_MONTHS > 0:
+                current = manager.interval_start(datetime.now(timezone.utc))
+                cutoff = manager.shift(current, -settings.TRANSACTION_RETENTION_MONTHS)
+                detached = manager.detach_older_than(cutoff, archive=settings.PARTITION_ARCHIVE)
+
+            # audit log retention is handled by delete_old_logs
+            audit_manager = PartitionManager(db, "audit_logs", interval=settings.AUDIT_LOG_PARTITION_INTERVAL)
+            created += audit_manager.ensure_partitions(ahead=settings.AUDIT_LOG_PARTITIONS_AHEAD)
+
+        logger.info(
+            f"✅ Partition maintenance completed. "
+            f"Created: {len(created)}, detached: {len(detached)}"
+        )
+
+        return {
+            "success": True,
+            "created": created,
+            "detached": detached,
+        }
+    except Exception as e:
+        logger.error(f"❌ Error during partition maintenance: {e}", exc_info=True)
+        raise
@@ -1,40 +1,58 @@
-import asyncio
 import logging
 import uuid
-from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import List
+from typing import List, Optional
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
-from aiogram.types import BufferedInputFile
 from celery.exceptions import Retry
 from tornado.locale import load_gettext_translations
 
 from app.bot.handlers.tx.balance_formatter import balance_formatter
-from app.bot.handlers.tx.transaction_formatter import format_transactions
+from app.bot.handlers.tx.transaction_formatter import format_transaction, pack_message_groups
 from app.core.celery import celery_app, async_task
 from app.core.configs import settings
+from app.core.tasks.dispatch import dispatch_for_companies
+from app.core.telegram import get_bot
 from app.db import get_db_session
-from app.models import Language
-from app.repo import CompanyRepository, BankAccountRepository, CompanyGroupRepository, TransactionRepository
+from app.models import Language, Transaction, TransactionNotification
+from app.repo import (
+    CompanyRepository,
+    BankAccountRepository,
+    CompanyGroupRepository,
+    TransactionRepository,
+    TransactionNotificationRepository,
+)
+from app.services.telegram import DeliveryResult, TelegramDelivery
 from app.utils.transaction_excel import handle_daily_report
 
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def get_telegram_bot():
-    bot_token = settings.BOT_TOKEN
-    if not bot_token:
-        raise RuntimeError("BOT_TOKEN not found in environment variables")
+def _log_failed_deliveries(results: List[DeliveryResult], company_groups: List, message_type: str) -> int:
+    titles = {company_group.group.telegram_id: company_group.group.title for company_group in company_groups}
+    for result in results:
+        if not result.success:
+            logger.error(
+                f"❌ Failed to send {message_type} to group {result.chat_id} "
+                f"({titles.get(result.chat_id, 'Unknown')}): {result.error}"
+            )
+    return sum(result.success for result in results)
 
-    bot = Bot(token=bot_token)
-    try:
-        yield bot
-    finally:
-        await bot.session.close()
+
+async def send_messages_to_company_groups(
+        bot: Bot,
+        company_groups: List,
+        messages: List[str],
+        message_type: str = "message",
+) -> int:
+    if not company_groups or not messages:
+        return 0
+
+    chat_ids = [company_group.group.telegram_id for company_group in company_groups]
+    results = await TelegramDelivery(bot).send_messages(chat_ids, messages)
+
+    return _log_failed_deliveries(results, company_groups, message_type)
 
 
 async def send_message_to_company_groups(
@@ -43,27 +61,7 @@ async def send_message_to_company_groups(
         message_text: str,
         message_type: str = "message",
 ) -> int:
-    if not company_groups:
-        return 0
-
-    sent_count = 0
-    for company_group in company_groups:
-        try:
-            group = company_group.group
-            await bot.send_message(
-                chat_id=group.telegram_id,
-                text=message_text,
-                parse_mode="HTML"
-            )
-            sent_count += 1
-            await asyncio.sleep(0.1)
-        except Exception as e:
-            logger.error(
-                f"❌ Failed to send {message_type} to group {group.telegram_id} "
-                f"({group.title}): {e}",
-                exc_info=True
-            )
-    return sent_count
+    return await send_messages_to_company_groups(bot, company_groups, [message_text], message_type)
 
 
 async def send_document_to_company_groups(
@@ -78,36 +76,100 @@ async def send_document_to_company_groups(
         logger.warning(f"No groups found for company {company_name}")
         return 0
 
-    sent_count = 0
-
-    for company_group in company_groups:
-        try:
-            group = company_group.group
+    chat_ids = [company_group.group.telegram_id for company_group in company_groups]
+    results = await TelegramDelivery(bot).send_file(
+        chat_ids,
+        file_bytes=file_bytes,
+        filename=filename,
+        caption=caption,
+    )
 
-            file = BufferedInputFile(file=file_bytes, filename=filename)
+    sent_count = _log_failed_deliveries(results, company_groups, "document")
+    logger.info(f"✅ Document sent to {sent_count}/{len(chat_ids)} groups for company {company_name}")
 
-            await bot.send_document(
-                chat_id=group.telegram_id,
-                document=file,
-                caption=caption,
-                parse_mode="HTML"
-            )
-            sent_count += 1
-            logger.info(
-                f"✅ Document sent to group {group.telegram_id} ({group.title}) "
-                f"for company {company_name}"
-            )
+    return sent_count
 
-            await asyncio.sleep(0.1)
 
-        except Exception as e:
+async def deliver_notifications(
+        bot: Bot,
+        notifications: List[TransactionNotification],
+        transactions: List[Transaction],
+) -> tuple[List[TransactionNotification], List[tuple[TransactionNotification, Optional[str]]]]:
+    """
+    Announce claimed notifications, packed into as few messages per group as
+    possible. Groups waiting for the same transactions share one send.
+
+    Every notification takes the outcome of the message its transaction went
+    out in, so a failed message only puts its own transactions back.
+    Notifications with nothing to announce (transaction gone, no direction)
+    count as sent. Returns the sent and the failed ones with their errors.
+    """
+    transactions_by_id = {transaction.id: transaction for transaction in transactions}
+    notifications_by_chat: dict[int, List[TransactionNotification]] = {}
+    for notification in notifications:
+        notifications_by_chat.setdefault(notification.group.telegram_id, []).append(notification)
+
+    chats_by_batch: dict[tuple, List[int]] = {}
+    for chat_id, chat_notifications in notifications_by_chat.items():
+        batch = tuple(sorted(
+            {
+                (notification.transaction_id, notification.direction)
+                for notification in chat_notifications
+                if notification.transaction_id in transactions_by_id
+            },
+            key=lambda item: (transactions_by_id[item[0]].document_date, item[0]),
+        ))
+        chats_by_batch.setdefault(batch, []).append(chat_id)
+
+    # (chat, transaction) -> result of the message that carried the transaction
+    outcomes: dict[tuple[int, uuid.UUID], DeliveryResult] = {}
+    delivery = TelegramDelivery(bot)
+    for batch, chat_ids in chats_by_batch.items():
+        parts, part_transaction_ids = [], []
+        for transaction_id, direction in batch:
+            part = format_transaction(
+                transactions_by_id[transaction_id],
+                lang=Language.RUSSIAN.value,
+                order=len(parts) + 1,
+                direction=direction,
+            )
+            if part is not None:
+                parts.append(part)
+                part_transaction_ids.append(transaction_id)
+
+        if not parts:
+            continue
+
+        groups = pack_message_groups(parts)
+        messages = ["".join(parts[idx] for idx in group).rstrip() for group in groups]
+
+        results_by_chat: dict[int, List[DeliveryResult]] = {}
+        for result in await delivery.send_messages(chat_ids, messages):
+            results_by_chat.setdefault(result.chat_id, []).append(result)
+
+        for chat_id, results in results_by_chat.items():
+            for group, result in zip(groups, results):
+                for idx in group:
+                    outcomes[(chat_id, part_transaction_ids[idx])] = result
+
+    sent, failed = [], []
+    for chat_id, chat_notifications in notifications_by_chat.items():
+        chat_failed = [
+            (notification, result.error)
+            for notification in chat_notifications
+            if (result := outcomes.get((chat_id, notification.transaction_id))) is not None and not result.success
+        ]
+        failed_ids = {notification.id for notification, _ in chat_failed}
+        sent.extend(notification for notification in chat_notifications if notification.id not in failed_ids)
+        failed.extend(chat_failed)
+
+        if chat_failed:
             logger.error(
-                f"❌ Failed to send document to group {group.telegram_id} "
-                f"({getattr(group, 'title', 'Unknown')}): {e}",
-                exc_info=True
+                f"❌ Failed to send {len(chat_failed)}/{len(chat_notifications)} transactions "
+                f"to group {chat_id}: {chat_failed[0][1]}"
             )
 
-    return sent_count
+    return sent, failed
 
 
 @celery_app.task(
@@ -135,8 +197,11 @@ async def send_single_company(self, company_id: str):
                 raise ValueError(f"Company with id: {company_id} doesn't have bank accounts")
 
             accounts = bank_account_repo.get_by_company_id(company_uuid)
-            new_transactions = transaction_repo.get_by_accounts(accounts=[account.account_number for account in accounts], date_from=datetime.now() - timedelta(hours=5))
-            if not new_transactions:
+            has_new_transactions = transaction_repo.has_account_transactions(
+                [account.account_number for account in accounts],
+                date_from=datetime.now() - timedelta(hours=5)
+            )
+            if not has_new_transactions:
                 logger.info(
                     "No transaction in last 5 hour"
                 )
@@ -164,13 +229,12 @@ async def send_single_company(self, company_id: str):
 
             message_text = await balance_formatter(company.name, accounts)
 
-            async with get_telegram_bot() as bot:
-                await send_message_to_company_groups(
-                    bot=bot,
-                    company_groups=company_groups,
-                    message_text=message_text,
-                    message_type="balance",
-                )
+            await send_message_to_company_groups(
+                bot=get_bot(),
+                company_groups=company_groups,
+                message_text=message_text,
+                message_type="balance",
+            )
 
             logger.info(
                 f"✅ Successfully processed company {company.id} ({company.name}). "
@@ -199,48 +263,28 @@ async def send_single_company(self, company_id: str):
 
 
 @celery_app.task(name="app.core.tasks.send_tasks.send_all_companies")
-@async_task
-async def send_all_companies():
+def send_all_companies():
     try:
         with get_db_session() as db:
             company_repo = CompanyRepository(db)
-            companies = company_repo.get_all(skip=0, limit=10000)
-            if not companies:
-                logger.warning("No companies found to process")
-                return {
-                    "success": True,
-                    "total_companies": 0,
-                    "tasks_dispatched": 0,
-                    "task_ids": [],
-                }
-
-            task_ids = []
-            for company in companies:
-                try:
-                    task = send_single_company.delay(str(company.id))
-                    task_ids.append({
-                        "company_id": str(company.id),
-                        "company_name": company.name,
-                        "task_id": task.id,
-                    })
-                    logger.info(f"📤 Dispatched task for company {company.id} ({company.name}): {task.id}")
-                except Exception as e:
-                    logger.error(
-                        f"❌ Failed to dispatch task for company {company.id}: {e}",
-                        exc_info=True
-                    )
-
-            logger.info(
-                f"✅ send_all_companies completed. "
-                f"Total companies: {len(companies)}, Tasks dispatched: {len(task_ids)}"
-            )
+            company_ids = [str(company_id) for company_id in company_repo.get_eligible_ids()]
 
+        if not company_ids:
+            logger.warning("No companies found to process")
             return {
                 "success": True,
-                "total_companies": len(companies),
-                "tasks_dispatched": len(task_ids),
-                "task_ids": task_ids,
+                "total_companies": 0,
+                "tasks_dispatched": 0,
             }
+
+        result = dispatch_for_companies(send_single_company, company_ids)
+
+        logger.info(
+            f"✅ send_all_companies completed. "
+            f"Total companies: {result['total_companies']}, Tasks dispatched: {result['tasks_dispatched']}"
+        )
+
+        return result
     except Exception as e:
         logger.error(f"❌ Critical error in send_all_companies: {e}", exc_info=True)
         raise
@@ -256,64 +300,53 @@ async def send_all_companies():
 async def send_single_company_transactions(self, company_id: str):
     try:
         with get_db_session() as db:
-            company_group_repo = CompanyGroupRepository(db)
-            bank_account_repo = BankAccountRepository(db)
+            notification_repo = TransactionNotificationRepository(db)
             transaction_repo = TransactionRepository(db)
 
             company_uuid = uuid.UUID(company_id)
-            bank_accounts = bank_account_repo.get_by_company_id(company_uuid)
-            logger.info(bank_accounts)
-
-            if not bank_accounts:
-                logger.info(f"Company with id: {company_id} doesn't have bank accounts")
-                return {
-                    "success": False,
-                    "company_id": str(company_id),
-                    "message": "Company doesn't have bank accounts",
-                }
 
-            timezone = ZoneInfo(settings.TIMEZONE)
-            now = datetime.now(timezone)
-            date_from = now - timedelta(hours=1)
-            transactions = transaction_repo.get_by_accounts(
-                accounts=[bank_account.account_number for bank_account in bank_accounts],
-                date_from=date_from
+            notifications = notification_repo.claim_pending(
+                company_uuid,
+                limit=settings.NOTIFICATION_BATCH_SIZE,
+                lease_seconds=settings.NOTIFICATION_LEASE_SECONDS,
             )
-            if not transactions:
-                logger.info(f"Company with id: {company_id} doesn't have bank transactions in last hour")
+            if not notifications:
+                logger.info(f"Company with id: {company_id} doesn't have pending transaction notifications")
                 return {
                     "success": False,
                     "company_id": str(company_id),
                     "message": "No new transactions found",
                 }
 
-            company_groups = company_group_repo.get_by_company_id(company_uuid)
-
-            if not company_groups:
-                logger.info(f"No groups associated with company {company_uuid}")
-                return {
-                    "success": False,
-                    "company_id": str(company_id),
-                    "message": "No groups associated with company",
-                }
-            formated_texts = format_transactions(transactions, lang=Language.RUSSIAN.value)
+            transactions = transaction_repo.get_by_keys(
+                [(notification.transaction_id, notification.document_date) for notification in notifications]
+            )
 
-            async with get_telegram_bot() as bot:
-                for message in formated_texts:
-                    await send_message_to_company_groups(
-                        bot=bot,
-                        company_groups=company_groups,
-                        message_text=message,
-                    )
+        # the rows are leased, so the session is closed while Telegram is being waited on
+        sent, failed = await deliver_notifications(get_bot(), notifications, transactions)
 
-            logger.info(
-                f"✅ Successfully processed transactions for company {company_uuid}. "
+        with get_db_session() as db:
+            TransactionNotificationRepository(db).record_results(
+                sent,
+                failed,
+                max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
             )
 
-            return {
-                "success": True,
-                "company_id": company_id,
-            }
+        if len(notifications) >= settings.NOTIFICATION_BATCH_SIZE:
+            # a full batch means more are waiting, keep draining
+            send_single_company_transactions.apply_async(args=(company_id,))
+
+        logger.info(
+            f"✅ Successfully processed transactions for company {company_uuid}. "
+            f"Notifications delivered: {len(sent)}, failed: {len(failed)}"
+        )
+
+        return {
+            "success": True,
+            "company_id": company_id,
+            "notifications_sent": len(sent),
+            "notifications_failed": len(failed),
+        }
 
     except Retry:
         raise
@@ -331,48 +364,27 @@ async def send_single_company_transactions(self, company_id: str):
 
 
 @celery_app.task(name="app.core.tasks.send_tasks.send_all_company_transactions")
-@async_task
-async def send_all_company_transactions():
+def send_all_company_transactions():
     try:
         with get_db_session() as db:
-            company_repo = CompanyRepository(db)
-            companies = company_repo.get_all(skip=0, limit=10000)
-
-            if not companies:
-                logger.info(f"No companies found")
-                return {
-                    "success": False,
-                    "message": "No companies found",
-                }
-
-            task_ids = []
-
-            for company in companies:
-                try:
-                    task = send_single_company_transactions.delay(str(company.id))
-                    task_ids.append({
-                        "company_id": str(company.id),
-                        "company_name": company.name,
-                        "task_id": task.id
-                    })
-                    logger.info(f"Task was settled for {company.name}")
-                except Exception as e:
-                    logger.error(
-                        f"❌ Failed to dispatch transaction image task for company {company.id}: {e}",
-                        exc_info=True
-                    )
-
-            logger.info(
-                f"✅ send_all_company_transactions completed. "
-                f"Total companies: {len(companies)}, Tasks dispatched: {len(task_ids)}"
-            )
+            notification_repo = TransactionNotificationRepository(db)
+            company_ids = [str(company_id) for company_id in notification_repo.get_pending_company_ids()]
 
+        if not company_ids:
+            logger.info("No pending transaction notifications")
             return {
                 "success": True,
-                "total_companies": len(companies),
-                "tasks_dispatched": len(task_ids),
-                "task_ids": task_ids,
+                "message": "No pending transaction notifications",
             }
+
+        result = dispatch_for_companies(send_single_company_transactions, company_ids)
+
+        logger.info(
+            f"✅ send_all_company_transactions completed. "
+            f"Total companies: {result['total_companies']}, Tasks dispatched: {result['tasks_dispatched']}"
+        )
+
+        return result
     except Exception as e:
         logger.error(f"❌ Critical error in send_all_company_transactions: {e}", exc_info=True)
         raise
@@ -433,19 +445,18 @@ async def single_company_daily_report(self, company_id: str):
                     f"ℹ️ За указанную дату движения по счетам отсутствуют."
                 )
 
-                async with get_telegram_bot() as bot:
-                    await send_message_to_company_groups(
-                        bot=bot,
-                        company_groups=company_groups,
-                        message_text=message,
-                    )
+                await send_message_to_company_groups(
+                    bot=get_bot(),
+                    company_groups=company_groups,
+                    message_text=message,
+                )
                 return {
                     "success": True,
                     "company_id": str(company_id),
                     "message": f"Report for company {company_id} was not created - no transactions found. So message was sent.",
                 }
 
-            filepath, pdf_bytes, filename = report_result
+            pdf_bytes, filename = report_result
 
             caption = (
                 f"📊 <b>Ежедневная выписка лицевых счетов</b>\n\n"
@@ -454,21 +465,14 @@ async def single_company_daily_report(self, company_id: str):
                 f"💳 Счетов: <b>{len(bank_accounts)}</b>"
             )
 
-            async with get_telegram_bot() as bot:
-                sent_count = await send_document_to_company_groups(
-                    bot=bot,
-                    company_groups=company_groups,
-                    file_bytes=pdf_bytes,
-                    filename=filename,
-                    caption=caption,
-                    company_name=company_name,
-                )
-
-            try:
-                Path(filepath).unlink()
-                logger.info(f"Cleaned up PDF file: {filepath}")
-            except Exception as e:
-                logger.error(f"Failed to delete PDF {filepath}: {e}")
+            sent_count = await send_document_to_company_groups(
+                bot=get_bot(),
+                company_groups=company_groups,
+                file_bytes=pdf_bytes,
+                filename=filename,
+                caption=caption,
+                company_name=company_name,
+            )
 
             logger.info(
                 f"✅ Daily report for company {company_name} sent to {sent_count} groups"
@@ -498,48 +502,43 @@ async def single_company_daily_report(self, company_id: str):
 
 
 @celery_app.task(name="app.core.tasks.send_tasks.send_daily_reports")
-@async_task
-async def send_daily_reports():
+def send_daily_reports():
     try:
         with get_db_session() as db:
             company_repo = CompanyRepository(db)
-            companies = company_repo.get_all(skip=0, limit=10000)
+            company_ids = [str(company_id) for company_id in company_repo.get_eligible_ids()]
 
-            if not companies:
-                logger.info(f"No companies found")
-                return {
-                    "success": False,
-                    "message": "No companies found",
-                }
+        if not company_ids:
+            logger.info("No companies found")
+            return {
+                "success": False,
+                "message": "No companies found",
+            }
 
-            task_ids = []
-
-            for company in companies:
-                try:
-                    task = single_company_daily_report.delay(str(company.id))
-                    task_ids.append({
-                        "company_id": str(company.id),
-                        "company_name": company.name,
-                        "task_id": task.id
-                    })
-                    logger.info(f"Task was settled for {company.name}")
-                except Exception as e:
-                    logger.error(
-                        f"❌ Failed to dispatch transaction image task for company {company.id}: {e}",
-                        exc_info=True
-                    )
+        result = dispatch_for_companies(single_company_daily_report, company_ids)
 
-            logger.info(
-                f"✅ send_all_company_transactions completed. "
-                f"Total companies: {len(companies)}, Tasks dispatched: {len(task_ids)}"
-            )
+        logger.info(
+            f"✅ send_daily_reports completed. "
+            f"Total companies: {result['total_companies']}, Tasks dispatched: {result['tasks_dispatched']}"
+        )
 
-            return {
-                "success": True,
-                "total_companies": len(companies),
-                "tasks_dispatched": len(task_ids),
-                "task_ids": task_ids,
-            }
+        return result
     except Exception as e:
-        logger.error(f"❌ Critical error in send_all_company_transactions: {e}", exc_info=True)
+        logger.error(f"❌ Critical error in send_daily_reports: {e}", exc_info=True)
         raise
+
+
+@celery_app.task(name="app.core.tasks.send_tasks.purge_transaction_notifications")
+def purge_transaction_notifications(days: Optional[int] = None):
+    days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+    cutoff = datetime.now(ZoneInfo(settings.TIMEZONE)) - timedelta(days=days)
+
+    with get_db_session() as db:
+        deleted = TransactionNotificationRepository(db).delete_finished_before(cutoff)
+
+    logger.info(f"✅ Deleted {deleted} delivered transaction notifications older than {days} days")
+
+    return {
+        "success": True,
+        "deleted": deleted,
+    }
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import weakref
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+# the bot's aiohttp session is bound to its loop, so keep one bot per loop
+_bots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Bot]" = weakref.WeakKeyDictionary()
+
+
+def create_bot() -> Bot:
+    if not settings.BOT_TOKEN:
+        raise RuntimeError("BOT_TOKEN not found in environment variables")
+
+    session = AiohttpSession()
+    if settings.TELEGRAM_API_SERVER:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_SERVER))
+
+    return Bot(token=settings.BOT_TOKEN, session=session)
+
+
+def get_bot() -> Bot:
+    """
+    Bot of the running event loop, with a keep-alive session to the Bot API.
+
+    Like the HTTP client pool, every loop gets its own bot.
+    """
+    loop = asyncio.get_running_loop()
+    bot = _bots.get(loop)
+
+    if bot is None:
+        bot = create_bot()
+        _bots[loop] = bot
+        logger.info("✅ Telegram bot session created")
+
+    return bot
+
+
+async def close_bot() -> None:
+    bot = _bots.pop(asyncio.get_running_loop(), None)
+
+    if bot is None:
+        return
+
+    await bot.session.close()
+    logger.info("Telegram bot session closed")
+
+
+__all__ = [
+    "create_bot",
+    "get_bot",
+    "close_bot",
+]
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import redis
+
+from app.core.redis import get_async_redis_client
+
+logger = logging.getLogger(__name__)
+
+_buckets: dict[str, "TokenBucket"] = {}
+
+# Reserves tokens from a bucket shared by every process and returns how many
+# milliseconds the caller has to wait before using them. The refill rate is
+# scaled by an adaptive factor that is halved on 429 responses and recovers
+# linearly over time; a Retry-After blocks the whole bucket until it passes.
+_ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local recovery = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'factor', 'blocked_until')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+local factor = tonumber(state[3]) or 1
+local blocked_until = tonumber(state[4]) or 0
+
+local elapsed = math.max(now - ts, 0) / 1000
+factor = math.min(1, factor + elapsed * recovery)
+local effective_rate = rate * factor
+tokens = math.min(capacity, tokens + elapsed * effective_rate) - requested
+
+local wait = 0
+if blocked_until > now then
+    wait = blocked_until - now
+end
+if tokens < 0 then
+    wait = math.max(wait, math.ceil(-tokens / effective_rate * 1000))
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'factor', factor, 'blocked_until', blocked_until)
+redis.call('PEXPIRE', KEYS[1], ttl)
+return wait
+"""
+
+_PENALIZE_SCRIPT = """
+local retry_after = tonumber(ARGV[1])
+local min_factor = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'factor', 'blocked_until')
+local factor = tonumber(state[1]) or 1
+local blocked_until = tonumber(state[2]) or 0
+
+factor = math.max(min_factor, factor / 2)
+blocked_until = math.max(blocked_until, now + retry_after)
+
+redis.call('HSET', KEYS[1], 'factor', factor, 'blocked_until', blocked_until)
+redis.call('PEXPIRE', KEYS[1], ttl)
+return tostring(factor)
+"""
+
+
+class TokenBucket:
+    """
+    In-process token bucket.
+
+    Callers reserve a token up front and sleep for the deficit, so no lock is
+    needed and the bucket is not bound to a particular event loop.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: int = 1) -> None:
+        self._refill(time.monotonic())
+        self._tokens -= tokens
+
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class RedisTokenBucket:
+    """
+    Token bucket stored in Redis and shared by all workers and the web process.
+
+    Falls back to an in-process bucket with the same limits when Redis is
+    unavailable, so a Redis outage degrades to per-process limiting.
+    """
+
+    def __init__(
+            self,
+            key: str,
+            rate: float,
+            capacity: int,
+            recovery_per_second: float = 0.01,
+            min_factor: float = 0.1,
+    ):
+        self.key = f"ratelimit:{key}"
+        self.rate = rate
+        self.capacity = capacity
+        self.recovery_per_second = recovery_per_second
+        self.min_factor = min_factor
+        self.ttl_ms = int(max(capacity / rate, 1) * 1000) + 10 * 60 * 1000
+        self._fallback = get_token_bucket(key, rate=rate, capacity=capacity)
+
+    async def acquire(self, tokens: int = 1) -> None:
+        try:
+            wait_ms = await get_async_redis_client().eval(
+                _ACQUIRE_SCRIPT,
+                1,
+                self.key,
+                self.rate,
+                self.capacity,
+                tokens,
+                self.recovery_per_second,
+                self.ttl_ms,
+            )
+        except (redis.RedisError, ConnectionError) as e:
+            logger.warning(f"Rate limiter {self.key} fell back to in-process bucket: {e}")
+            await self._fallback.acquire(tokens)
+            return
+
+        if wait_ms:
+            await asyncio.sleep(int(wait_ms) / 1000)
+
+    async def penalize(self, retry_after: Optional[float] = None) -> None:
+        retry_after_ms = int((retry_after or 0) * 1000)
+        try:
+            factor = await get_async_redis_client().eval(
+                _PENALIZE_SCRIPT,
+                1,
+                self.key,
+                retry_after_ms,
+                self.min_factor,
+                self.ttl_ms,
+            )
+            logger.warning(f"Rate limiter {self.key} throttled, rate factor is now {factor}")
+        except (redis.RedisError, ConnectionError) as e:
+            logger.warning(f"Failed to penalize rate limiter {self.key}: {e}")
+
+
+def get_token_bucket(name: str, rate: float, capacity: int) -> TokenBucket:
+    bucket = _buckets.get(name)
+
+    if bucket is None:
+        bucket = TokenBucket(rate=rate, capacity=capacity)
+        _buckets[name] = bucket
+
+    return bucket
+
+
+__all__ = [
+    "TokenBucket",
+    "RedisTokenBucket",
+    "get_token_bucket",
+]
@@ -7,8 +7,8 @@ from app.core.configs import settings
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_MAX_OVERFLOW
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -2,7 +2,7 @@ import logging
 import sys
 from contextlib import asynccontextmanager
 
-from aiogram import Bot, Dispatcher, types
+from aiogram import Dispatcher, types
 from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response
@@ -17,7 +17,11 @@ from app import routers as fast_router
 from app.admin import setup_admin
 from app.bot import middlewares as bot_middleware
 from app.core.configs import settings
+from app.core.http import close_http_client
+from app.core.redis import close_async_redis_client
 from app.core.rate_limiter import limiter
+from app.core.telegram import create_bot
+from app.services import close_audit_log_writer
 from app.utils import rate_limit_handler
 
 load_dotenv()
@@ -27,7 +31,7 @@ logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
 logger = logging.getLogger(__name__)
 
 # ------- Bot ------- #
-bot = Bot(token=settings.BOT_TOKEN)
+bot = create_bot()
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
@@ -36,6 +40,7 @@ dp.include_router(tg_bot.auth_router)
 dp.include_router(tg_bot.role_router)
 dp.include_router(tg_bot.command_router)
 dp.include_router(tg_bot.balance_router)
+dp.include_router(tg_bot.statement_router)
 dp.include_router(tg_bot.group_chat_router)
 dp.include_router(tg_bot.lang_router)
 
@@ -63,6 +68,9 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await close_audit_log_writer()
+    await close_http_client()
+    await close_async_redis_client()
     await bot.session.close()
 
 
@@ -100,6 +108,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 # ------- Admin ------- #
 setup_admin(app)
@@ -1 +1,2 @@
 from .bank_account import *
+from .sync_state import *
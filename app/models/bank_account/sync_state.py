@@ -0,0 +1,67 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime, Enum as SQLEnum, ForeignKey, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.abstract import UUIDBase, TimestampMixin
+from app.models.enums import BankTypes
+
+
+class BankSyncState(UUIDBase, TimestampMixin):
+    """
+    Incremental transaction sync progress of a company at one bank.
+
+    ``last_*`` is the watermark: the newest payment order seen by the last
+    completed sync. ``cursor_*`` describes the scan in progress so that an
+    interrupted sync can resume, and ``pending_transaction_ids`` holds orders
+    that were collected but not stored yet. ``pending_attempts`` counts the
+    completed syncs that could not store each pending order.
+    """
+    __tablename__ = "bank_sync_states"
+    __table_args__ = (
+        UniqueConstraint("company_id", "bank_type", name="uq_bank_sync_states_company_bank"),
+    )
+
+    company_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    bank_type: Mapped[BankTypes] = mapped_column(
+        SQLEnum(BankTypes, native_enum=False, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=False,
+    )
+
+    last_transaction_id: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    last_document_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    cursor_page: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    cursor_transaction_id: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    cursor_document_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    pending_transaction_ids: Mapped[list[str]] = mapped_column(
+        JSONB,
+        nullable=False,
+        default=list,
+        server_default=text("'[]'::jsonb"),
+    )
+    pending_attempts: Mapped[dict[str, int]] = mapped_column(
+        JSONB,
+        nullable=False,
+        default=dict,
+        server_default=text("'{}'::jsonb"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<BankSyncState company_id={self.company_id} "
+            f"bank_type={self.bank_type} "
+            f"last_transaction_id={self.last_transaction_id} "
+            f"cursor_page={self.cursor_page}>"
+        )
+
+
+__all__ = ["BankSyncState"]
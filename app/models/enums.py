@@ -33,6 +33,13 @@ class TransactionStatus(str, Enum):
     CANCELED = "canceled"
 
 
+class NotificationStatus(str, Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class BankTypes(str, Enum):
     KAPITALBANK = "KAPITALBANK"
     IPAK_YULI = "IPAK_YULI"
@@ -93,6 +100,7 @@ __all__ = [
     "UserRole",
     "GroupRole",
     "TransactionStatus",
+    "NotificationStatus",
     "BankTypes",
     "Actions",
     "ActionType",
@@ -1,7 +1,8 @@
+from datetime import datetime
 from typing import Optional, Any
 from uuid import UUID
 
-from sqlalchemy import String, JSON, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, JSON, ForeignKey, Enum as SQLEnum, DateTime, Index, text
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from app.models.abstract import TimestampMixin, UUIDBase
@@ -10,6 +11,22 @@ from app.models.enums import ActionCategory
 
 class AuditLog(UUIDBase, TimestampMixin):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_created_at", "created_at", "id"),
+        Index("ix_audit_logs_category_created_at", "category", "created_at", "id"),
+        Index("ix_audit_logs_action_created_at", "action", "created_at", "id"),
+        Index("ix_audit_logs_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_audit_logs_admin_id_created_at", "admin_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # created_at is the partition key, so it has to be part of the primary key
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        primary_key=True,
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
 
     admin_id: Mapped[UUID] = mapped_column(
         ForeignKey("admin_users.id", ondelete="CASCADE"),
@@ -1,2 +1,3 @@
 from .transaction import *
 from .transaction_user import *
+from .notification import *
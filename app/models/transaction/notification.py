@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime, Enum as SQLEnum, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.abstract import UUIDBase, TimestampMixin
+from app.models.enums import NotificationStatus
+
+
+class TransactionNotification(UUIDBase, TimestampMixin):
+    """
+    Outbox row: one transaction to be announced in one Telegram group.
+
+    Rows are written in the same database transaction that stores the
+    payment order, so nothing synced is missed, and ``idempotency_key``
+    keeps a transaction from being queued for the same group twice.
+    """
+    __tablename__ = "transaction_notifications"
+    __table_args__ = (
+        Index(
+            "ix_transaction_notifications_pending",
+            "company_id",
+            "created_at",
+            postgresql_where=text("status IN ('PENDING', 'SENDING')"),
+        ),
+        Index("ix_transaction_notifications_status_updated_at", "status", "updated_at"),
+    )
+
+    idempotency_key: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+
+    # no foreign key: a partitioned table's primary key includes document_date
+    transaction_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    document_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    company_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("companies.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # "in" or "out" as seen by company_id, which may be the counterparty of the stored row
+    direction: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+
+    status: Mapped[NotificationStatus] = mapped_column(
+        SQLEnum(NotificationStatus, name="notification_status"),
+        nullable=False,
+        default=NotificationStatus.PENDING,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # end of the SENDING lease; the row is claimable again after it
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    group: Mapped["Group"] = relationship("Group", lazy="joined")
+
+    @staticmethod
+    def build_idempotency_key(transaction_id: uuid.UUID, group_id: uuid.UUID) -> str:
+        return f"{transaction_id}:{group_id}"
+
+    def __repr__(self) -> str:
+        return (
+            f"<TransactionNotification id={self.id} transaction_id={self.transaction_id} "
+            f"group_id={self.group_id} status={self.status}>"
+        )
+
+
+__all__ = ["TransactionNotification"]
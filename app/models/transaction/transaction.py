@@ -1,15 +1,32 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import String, Numeric, Enum as SQLEnum, DateTime
+from sqlalchemy import String, Numeric, Enum as SQLEnum, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from app.models import UUIDBase
-from app.models.enums import TransactionStatus
+from app.models.enums import BankTypes, TransactionStatus
+
+
+# stored when the bank does not report a date; document_date is the partition key
+UNKNOWN_DOCUMENT_DATE = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class Transaction(UUIDBase):
     __tablename__ = "transactions"
+    __table_args__ = (
+        UniqueConstraint("bank_type", "transaction_id", "document_date", name="uq_transactions_bank_transaction_id"),
+        Index("ix_transactions_sender_account_document_date", "sender_account", "document_date"),
+        Index("ix_transactions_receiver_account_document_date", "receiver_account", "document_date"),
+        {"postgresql_partition_by": "RANGE (document_date)"},
+    )
+
+    bank_type: Mapped[BankTypes] = mapped_column(
+        SQLEnum(BankTypes, native_enum=False, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=False,
+        default=BankTypes.KAPITALBANK,
+        server_default=BankTypes.KAPITALBANK.value,
+    )
 
     receiver_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     receiver_inn: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
@@ -30,7 +47,12 @@ class Transaction(UUIDBase):
     payment_number: Mapped[str] = mapped_column(String(50), nullable=True)
     direction: Mapped[str] = mapped_column(String(16), nullable=True)
 
-    document_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    document_date: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        primary_key=True,
+        nullable=False,
+        default=UNKNOWN_DOCUMENT_DATE,
+    )
 
     status: Mapped[TransactionStatus] = mapped_column(
         SQLEnum(TransactionStatus, name="transaction_status"),
@@ -38,8 +60,10 @@ class Transaction(UUIDBase):
         default=TransactionStatus.UNFILLED
     )
 
+    # no foreign key: a partitioned table's primary key includes document_date
     transaction_users: Mapped[list["TransactionUser"]] = relationship(
         "TransactionUser",
+        primaryjoin="Transaction.id == foreign(TransactionUser.transaction_id)",
         back_populates="transaction",
         cascade="all, delete-orphan",
         lazy="selectin"
@@ -76,4 +100,4 @@ class Transaction(UUIDBase):
         return f"<Transaction id={self.id} amount={self.payment_amount} status={self.status}>"
 
 
-__all__ = ["Transaction"]
+__all__ = ["Transaction", "UNKNOWN_DOCUMENT_DATE"]
@@ -15,7 +15,7 @@ class TransactionUser(UUIDBase, TimestampMixin):
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     transaction_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True), nullable=False, index=True
     )
     role: Mapped[UserRole] = mapped_column(
         SQLEnum(UserRole, name="transaction_role"),
@@ -30,6 +30,7 @@ class TransactionUser(UUIDBase, TimestampMixin):
     )
     transaction: Mapped["Transaction"] = relationship(
         "Transaction",
+        primaryjoin="foreign(TransactionUser.transaction_id) == Transaction.id",
         back_populates="transaction_users",
         lazy="joined"
     )
@@ -4,5 +4,6 @@ from .bank_account import *
 from .base import *
 from .certificate import *
 from .company import *
+from .partition import *
 from .telegram import *
 from .transaction import *
@@ -1,19 +1,41 @@
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, insert, text, tuple_
+from sqlalchemy.orm import Session, noload, selectinload
 
 from app.admin import AdminUser
-from app.models import Actions, User
+from app.core.configs import settings
+from app.models import Actions, ActionCategory, User
 from app.models.log import AuditLog
 from app.repo.base import BaseRepository
+from app.repo.partition import PartitionManager
 
 
 class AuditLogRepository(BaseRepository[AuditLog]):
     def __init__(self, db: Session):
         super().__init__(db, AuditLog)
 
+    @staticmethod
+    def build_entry(
+            action: Actions,
+            user: Optional[User] = None,
+            admin: Optional[AdminUser] = None,
+            payload: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        return {
+            "id": uuid.uuid4(),
+            "created_at": now,
+            "updated_at": now,
+            "user_id": user.id if user else None,
+            "admin_id": admin.id if admin else None,
+            "action": action.name.value,
+            "category": action.category,
+            "payload": payload,
+        }
+
     def create(
             self,
             action: Actions,
@@ -29,6 +51,56 @@ class AuditLogRepository(BaseRepository[AuditLog]):
             payload=payload,
         )
 
+    def create_many(self, entries: list[Dict[str, Any]]) -> int:
+        """Insert entries built by ``build_entry`` with multi-row INSERTs."""
+        if not entries:
+            return 0
+
+        self.db.execute(insert(AuditLog), entries)
+        self.db.commit()
+
+        return len(entries)
+
+    def get_page(
+            self,
+            category: Optional[ActionCategory] = None,
+            action: Optional[str] = None,
+            user_id: Optional[uuid.UUID] = None,
+            admin_id: Optional[uuid.UUID] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            after: Optional[tuple[datetime, uuid.UUID]] = None,
+            skip: int = 0,
+            limit: int = 100,
+            expand: bool = False,
+    ) -> list[AuditLog]:
+        """
+        Newest logs first, ordered by (created_at, id). Pass the last row's
+        (created_at, id) as ``after`` to get the next page without an OFFSET
+        scan; ``skip`` is applied on top of it.
+        """
+        loader = selectinload if expand else noload
+        query = self.db.query(AuditLog).options(loader(AuditLog.user), loader(AuditLog.admin))
+
+        if category is not None:
+            query = query.filter(AuditLog.category == category)
+        if action is not None:
+            query = query.filter(AuditLog.action == action)
+        if user_id is not None:
+            query = query.filter(AuditLog.user_id == user_id)
+        if admin_id is not None:
+            query = query.filter(AuditLog.admin_id == admin_id)
+        if date_from is not None:
+            query = query.filter(AuditLog.created_at >= date_from)
+        if date_to is not None:
+            query = query.filter(AuditLog.created_at <= date_to)
+        if after is not None:
+            query = query.filter(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(*after))
+
+        return query.order_by(
+            desc(AuditLog.created_at), desc(AuditLog.id)
+        ).offset(skip).limit(limit).all()
+
     def get_recent_logs(self, limit: int = 100) -> list[type[AuditLog]]:
         return self.db.query(AuditLog).order_by(
             desc(AuditLog.created_at)
@@ -39,21 +111,49 @@ class AuditLogRepository(BaseRepository[AuditLog]):
             AuditLog.action == action.name.value,
         ).order_by(desc(AuditLog.created_at)).limit(limit).all()
 
-    def delete_old_logs(self, days: int = 30, batch_size: int = 1000) -> int:
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        log_ids = self.db.query(AuditLog.id).filter(
-            AuditLog.created_at < cutoff_date
-        ).limit(batch_size).all()
-
-        if not log_ids:
-            return 0
-
-        ids_to_delete = [log_id[0] for log_id in log_ids]
+    def retention_cutoff(self, days: int) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=days)
+
+    def drop_old_partitions(self, cutoff: datetime, archive: bool = False) -> list[str]:
+        manager = PartitionManager(self.db, AuditLog.__tablename__, interval=settings.AUDIT_LOG_PARTITION_INTERVAL)
+        if not manager.is_partitioned():
+            return []
+
+        return manager.detach_older_than(cutoff, archive=archive)
+
+    def tables_with_old_logs(self, cutoff: datetime) -> list[str]:
+        """
+        Tables that can still hold rows older than ``cutoff`` after whole
+        partitions are gone: the partitions straddling the cutoff (plus the
+        default one), or the table itself on non-partitioned installs.
+        """
+        manager = PartitionManager(self.db, AuditLog.__tablename__, interval=settings.AUDIT_LOG_PARTITION_INTERVAL)
+        if not manager.is_partitioned():
+            return [AuditLog.__tablename__]
+
+        tables = [
+            partition.name for partition in manager.partitions()
+            if partition.lower is None or partition.lower < cutoff
+        ]
+        return [*tables, f"{AuditLog.__tablename__}_default"]
+
+    def count_old_logs(self, table: str, cutoff: datetime) -> int:
+        return self.db.scalar(
+            text(f'SELECT count(*) FROM "{table}" WHERE created_at < :cutoff'),
+            {"cutoff": cutoff},
+        )
 
-        deleted = self.db.query(AuditLog).filter(
-            AuditLog.id.in_(ids_to_delete)
-        ).delete(synchronize_session=False)
+    def delete_old_logs(self, table: str, cutoff: datetime, batch_size: int = 1000) -> int:
+        # ctid is only unique within a single table, so this must not run on a partitioned parent
+        deleted = self.db.execute(
+            text(f"""
+                DELETE FROM "{table}"
+                WHERE ctid = ANY(ARRAY(
+                    SELECT ctid FROM "{table}" WHERE created_at < :cutoff LIMIT :batch_size
+                ))
+            """),
+            {"cutoff": cutoff, "batch_size": batch_size},
+        ).rowcount
 
         self.db.commit()
 
@@ -1 +1,2 @@
-from .bank_account_repository import * # noqa
\ No newline at end of file
+from .bank_account_repository import * # noqa
+from .sync_state_repository import * # noqa
@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.bank_account.sync_state import BankSyncState
+from app.models.enums import BankTypes
+from app.repo.base import BaseRepository
+
+
+class BankSyncStateRepository(BaseRepository[BankSyncState]):
+    def __init__(self, db: Session):
+        super().__init__(db, BankSyncState)
+
+    def get_or_create(self, company_id: uuid.UUID, bank_type: BankTypes) -> BankSyncState:
+        stmt = insert(BankSyncState).values(
+            id=uuid.uuid4(),
+            company_id=company_id,
+            bank_type=bank_type,
+            pending_transaction_ids=[],
+            pending_attempts={},
+        ).on_conflict_do_nothing(constraint="uq_bank_sync_states_company_bank")
+        self.db.execute(stmt)
+        self.db.commit()
+
+        return self.db.scalars(
+            select(BankSyncState).where(
+                BankSyncState.company_id == company_id,
+                BankSyncState.bank_type == bank_type,
+            )
+        ).one()
+
+    def save_progress(
+            self,
+            state: BankSyncState,
+            cursor_page: Optional[int],
+            pending_transaction_ids: list[str],
+    ) -> None:
+        state.cursor_page = cursor_page
+        state.pending_transaction_ids = list(pending_transaction_ids)
+        self.db.commit()
+
+    def start_scan(self, state: BankSyncState, transaction_id: str, document_date: Optional[datetime]) -> None:
+        state.cursor_transaction_id = transaction_id
+        state.cursor_document_date = document_date
+        self.db.commit()
+
+    def complete(
+            self,
+            state: BankSyncState,
+            pending_transaction_ids: list[str],
+            max_attempts: Optional[int] = None,
+    ) -> list[str]:
+        """
+        Finish the scan and keep ``pending_transaction_ids`` for the next sync.
+
+        Every pending order counts one more attempt; orders that reach
+        ``max_attempts`` are dropped instead and returned.
+        """
+        previous_attempts = state.pending_attempts or {}
+        attempts = {}
+        dropped_ids = []
+        for transaction_id in pending_transaction_ids:
+            count = previous_attempts.get(transaction_id, 0) + 1
+            if max_attempts and count >= max_attempts:
+                dropped_ids.append(transaction_id)
+            else:
+                attempts[transaction_id] = count
+
+        if state.cursor_transaction_id is not None:
+            state.last_transaction_id = state.cursor_transaction_id
+            state.last_document_date = state.cursor_document_date
+
+        state.cursor_page = None
+        state.cursor_transaction_id = None
+        state.cursor_document_date = None
+        state.pending_transaction_ids = list(attempts)
+        state.pending_attempts = attempts
+        self.db.commit()
+
+        return dropped_ids
+
+
+__all__ = [
+    "BankSyncStateRepository"
+]
@@ -57,6 +57,15 @@ class CompanyRepository(BaseRepository[Company]):
         stmt = select(exists().where(BankAccount.company_id == company_id))
         return self.db.scalar(stmt)
 
+    def get_eligible_ids(self, with_bank_accounts: bool = True, with_groups: bool = True) -> list[uuid.UUID]:
+        stmt = select(Company.id)
+        if with_bank_accounts:
+            stmt = stmt.where(exists().where(BankAccount.company_id == Company.id))
+        if with_groups:
+            stmt = stmt.where(exists().where(CompanyGroup.company_id == Company.id))
+
+        return list(self.db.scalars(stmt))
+
     def get_bank_accounts_count(self, company_id: uuid.UUID) -> int:
         return self.db.query(BankAccount).filter(
             BankAccount.company_id == company_id
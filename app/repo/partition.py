@@ -0,0 +1,190 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("transactions", "audit_logs")
+
+_BOUND_PATTERN = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+_KEY_PATTERN = re.compile(r'RANGE \("?(\w+)"?\)')
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+
+def is_partition_table(name: str) -> bool:
+    """Child, default and archived partition tables are managed here, not by the models."""
+    return any(
+        re.fullmatch(rf"{table}_(legacy|default|p\d{{8}}|archive_\w+)", name)
+        for table in PARTITIONED_TABLES
+    )
+
+
+class PartitionManager:
+    """
+    Maintains range partitions of a table over a timestamptz column, one per
+    UTC day, ISO week or month. Partitions are named ``<table>_pYYYYMMDD``
+    after the start of their range.
+    """
+
+    INTERVALS = ("day", "week", "month")
+
+    def __init__(self, db: Session, table: str, interval: str = "month"):
+        if interval not in self.INTERVALS:
+            raise ValueError(f"Unsupported partition interval: {interval}")
+
+        self.db = db
+        self.table = table
+        self.interval = interval
+
+    def interval_start(self, moment: datetime) -> datetime:
+        moment = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.interval == "week":
+            return moment - timedelta(days=moment.weekday())
+        if self.interval == "month":
+            return moment.replace(day=1)
+        return moment
+
+    def shift(self, start: datetime, intervals: int) -> datetime:
+        if self.interval == "day":
+            return start + timedelta(days=intervals)
+        if self.interval == "week":
+            return start + timedelta(weeks=intervals)
+
+        month = start.month - 1 + intervals
+        return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.table}_p{start:%Y%m%d}"
+
+    def is_partitioned(self) -> bool:
+        relkind = self.db.scalar(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": self.table},
+        )
+        return relkind == "p"
+
+    def partitions(self) -> list[Partition]:
+        rows = self.db.execute(text("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.oid = to_regclass(:table)
+        """), {"table": self.table}).all()
+
+        partitions = []
+        for name, bound in rows:
+            match = _BOUND_PATTERN.search(bound or "")
+            if match is None:
+                continue
+            partitions.append(Partition(name, self._parse_bound(match.group(1)), self._parse_bound(match.group(2))))
+
+        return sorted(partitions, key=lambda partition: partition.upper or datetime.max.replace(tzinfo=timezone.utc))
+
+    @staticmethod
+    def _parse_bound(value: str) -> Optional[datetime]:
+        value = value.strip("'")
+        if value in ("MINVALUE", "MAXVALUE"):
+            return None
+        return datetime.fromisoformat(value)
+
+    def partition_column(self) -> str:
+        key = self.db.scalar(text("SELECT pg_get_partkeydef(to_regclass(:table))"), {"table": self.table})
+        return _KEY_PATTERN.fullmatch(key).group(1)
+
+    def ensure_partitions(self, ahead: int) -> list[str]:
+        """
+        Create partitions up to ``ahead`` intervals from now, then the default
+        partition. Each partition is created in its own savepoint; on failure
+        the error is logged and the later ranges are left for the next run, so
+        no gap is left behind the newest partition.
+        """
+        if not self.is_partitioned():
+            logger.warning(f"Table {self.table} is not partitioned, skipping")
+            return []
+
+        current = self.interval_start(datetime.now(timezone.utc))
+        until = self.shift(current, ahead + 1)
+        uppers = [partition.upper for partition in self.partitions() if partition.upper]
+        # start right after the newest partition so a missed run leaves no hole
+        start = max(uppers) if uppers else current
+
+        created = []
+        while start < until:
+            end = self.shift(self.interval_start(start), 1)
+            name = self.partition_name(start)
+            try:
+                with self.db.begin_nested():
+                    self._create_partition(name, start, end)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Could not create partition {name} of {self.table}: {e}", exc_info=True)
+                break
+
+            created.append(name)
+            start = end
+
+        self.db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}_default" PARTITION OF "{self.table}" DEFAULT'
+        ))
+        self.db.commit()
+
+        return created
+
+    def _create_partition(self, name: str, start: datetime, end: datetime) -> None:
+        default = f"{self.table}_default"
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        column = self.partition_column()
+        in_range = f"\"{column}\" >= '{start.isoformat()}' AND \"{column}\" < '{end.isoformat()}'"
+
+        has_default = self.db.scalar(text("SELECT to_regclass(:default) IS NOT NULL"), {"default": default})
+        if not has_default or not self.db.scalar(text(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE {in_range})')):
+            self.db.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.table}" FOR VALUES {bounds}'))
+            return
+
+        # a range partition cannot be created while the default partition holds rows of its range
+        self.db.execute(text(f'ALTER TABLE "{self.table}" DETACH PARTITION "{default}"'))
+        self.db.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{self.table}" FOR VALUES {bounds}'))
+        moved = self.db.execute(text(f'INSERT INTO "{self.table}" SELECT * FROM "{default}" WHERE {in_range}')).rowcount
+        self.db.execute(text(f'DELETE FROM "{default}" WHERE {in_range}'))
+        self.db.execute(text(f'ALTER TABLE "{self.table}" ATTACH PARTITION "{default}" DEFAULT'))
+        logger.warning(f"Moved {moved} rows of {self.table} from the default partition to {name}")
+
+    def detach_older_than(self, cutoff: datetime, archive: bool = True) -> list[str]:
+        """
+        Detach partitions whose whole range is before ``cutoff``. Archived
+        partitions are kept as standalone ``<table>_archive_*`` tables,
+        otherwise they are dropped.
+        """
+        detached = []
+        for partition in self.partitions():
+            if partition.upper is None or partition.upper > cutoff:
+                continue
+
+            self.db.execute(text(f'ALTER TABLE "{self.table}" DETACH PARTITION "{partition.name}"'))
+            if archive:
+                suffix = partition.name.removeprefix(f"{self.table}_")
+                self.db.execute(text(f'ALTER TABLE "{partition.name}" RENAME TO "{self.table}_archive_{suffix}"'))
+            else:
+                self.db.execute(text(f'DROP TABLE "{partition.name}"'))
+            self.db.commit()
+
+            detached.append(partition.name)
+
+        return detached
+
+
+__all__ = [
+    "Partition",
+    "PartitionManager",
+    "is_partition_table",
+]
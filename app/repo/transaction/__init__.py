@@ -1,2 +1,3 @@
 from .transaction_repository import * # noqa
-from .transaction_user_repository import * # noqa
\ No newline at end of file
+from .transaction_user_repository import * # noqa
+from .notification_repository import * # noqa
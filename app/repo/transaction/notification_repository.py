@@ -0,0 +1,201 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, delete, update, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.bank_account.bank_account import BankAccount
+from app.models.company.company_group import CompanyGroup
+from app.models.enums import NotificationStatus
+from app.models.transaction.notification import TransactionNotification
+from app.models.transaction.transaction import Transaction
+from app.repo.base import BaseRepository
+
+ENQUEUE_CHUNK_SIZE = 1000
+
+
+class TransactionNotificationRepository(BaseRepository[TransactionNotification]):
+
+    def __init__(self, db: Session):
+        super().__init__(db, TransactionNotification)
+
+    def enqueue(self, transactions: list[Transaction]) -> int:
+        """
+        Queue every transaction for the groups of each company on either side
+        of it, matched by account number, so a transfer between two clients is
+        announced to both.
+
+        Doesn't commit: the caller commits together with the transactions, so
+        a stored payment order always has its notifications.
+        """
+        account_numbers = {
+            account
+            for transaction in transactions
+            for account in (transaction.sender_account, transaction.receiver_account)
+            if account
+        }
+        owners = dict(self.db.execute(
+            select(BankAccount.account_number, BankAccount.company_id)
+            .where(BankAccount.account_number.in_(account_numbers))
+        ).all()) if account_numbers else {}
+
+        parties = {transaction.id: self._parties(transaction, owners) for transaction in transactions}
+        company_ids = {company_id for companies in parties.values() for company_id in companies}
+        if not company_ids:
+            return 0
+
+        groups_by_company: dict[uuid.UUID, list[uuid.UUID]] = {}
+        for company_id, group_id in self.db.execute(
+                select(CompanyGroup.company_id, CompanyGroup.group_id).where(CompanyGroup.company_id.in_(company_ids))
+        ):
+            groups_by_company.setdefault(company_id, []).append(group_id)
+
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "idempotency_key": TransactionNotification.build_idempotency_key(transaction.id, group_id),
+                "transaction_id": transaction.id,
+                "document_date": transaction.document_date,
+                "company_id": company_id,
+                "group_id": group_id,
+                "direction": direction,
+                "status": NotificationStatus.PENDING,
+            }
+            for transaction in transactions
+            for company_id, direction in parties[transaction.id].items()
+            for group_id in groups_by_company.get(company_id, [])
+        ]
+        # a group linked to both sides gets the transaction once
+        rows = list({row["idempotency_key"]: row for row in reversed(rows)}.values())
+
+        queued = 0
+        for start in range(0, len(rows), ENQUEUE_CHUNK_SIZE):
+            statement = insert(TransactionNotification).values(rows[start:start + ENQUEUE_CHUNK_SIZE])
+            queued += self.db.execute(
+                statement.on_conflict_do_nothing(index_elements=[TransactionNotification.idempotency_key])
+            ).rowcount
+
+        return queued
+
+    @staticmethod
+    def _parties(transaction: Transaction, owners: dict[str, uuid.UUID]) -> dict[uuid.UUID, Optional[str]]:
+        """Companies on either side of the transaction with its direction as each of them sees it."""
+        parties = {}
+        for account, direction in ((transaction.receiver_account, "in"), (transaction.sender_account, "out")):
+            company_id = owners.get(account)
+            if company_id and company_id not in parties:
+                parties[company_id] = direction
+
+        return parties
+
+    @staticmethod
+    def _claimable(now: datetime):
+        # pending rows, and rows whose sender died before recording the outcome
+        return or_(
+            TransactionNotification.status == NotificationStatus.PENDING,
+            and_(
+                TransactionNotification.status == NotificationStatus.SENDING,
+                TransactionNotification.locked_until < now,
+            ),
+        )
+
+    def get_pending_company_ids(self) -> list[uuid.UUID]:
+        return list(self.db.scalars(
+            select(TransactionNotification.company_id)
+            .where(self._claimable(datetime.now(timezone.utc)))
+            .distinct()
+        ))
+
+    def claim_pending(self, company_id: uuid.UUID, limit: int, lease_seconds: int) -> list[TransactionNotification]:
+        """
+        Lease the company's oldest claimable notifications as SENDING and
+        commit, so no row lock is held while Telegram is slow. A lease that
+        runs out before record_results() makes the rows claimable again.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = (
+            select(TransactionNotification.id)
+            .where(TransactionNotification.company_id == company_id, self._claimable(now))
+            .order_by(TransactionNotification.created_at, TransactionNotification.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        ids = list(self.db.scalars(
+            update(TransactionNotification)
+            .where(TransactionNotification.id.in_(claimable.scalar_subquery()))
+            .values(status=NotificationStatus.SENDING, locked_until=now + timedelta(seconds=lease_seconds))
+            .returning(TransactionNotification.id),
+            execution_options={"synchronize_session": False},
+        ))
+        self.db.commit()
+
+        if not ids:
+            return []
+
+        return list(self.db.scalars(
+            select(TransactionNotification)
+            .where(TransactionNotification.id.in_(ids))
+            .options(joinedload(TransactionNotification.group).noload("*"))
+            .order_by(TransactionNotification.created_at, TransactionNotification.id)
+        ).unique())
+
+    def record_results(
+            self,
+            sent: list[TransactionNotification],
+            failed: list[tuple[TransactionNotification, Optional[str]]],
+            max_attempts: int,
+    ) -> None:
+        """
+        Store the outcome of a send and end the lease: failed rows go back
+        to PENDING, or to FAILED once they used up their attempts. Works on
+        ids, so the notifications may come from a closed session.
+        """
+        if sent:
+            self.db.execute(
+                update(TransactionNotification)
+                .where(TransactionNotification.id.in_([notification.id for notification in sent]))
+                .values(
+                    status=NotificationStatus.SENT,
+                    attempts=TransactionNotification.attempts + 1,
+                    sent_at=datetime.now(timezone.utc),
+                    last_error=None,
+                    locked_until=None,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+
+        failed_by_error: dict[Optional[str], list[uuid.UUID]] = {}
+        for notification, error in failed:
+            failed_by_error.setdefault((error or "")[:500] or None, []).append(notification.id)
+
+        for error, ids in failed_by_error.items():
+            statement = update(TransactionNotification).where(TransactionNotification.id.in_(ids))
+            values = {"attempts": TransactionNotification.attempts + 1, "last_error": error, "locked_until": None}
+
+            for used_up, status in ((True, NotificationStatus.FAILED), (False, NotificationStatus.PENDING)):
+                condition = TransactionNotification.attempts + 1 >= max_attempts
+                self.db.execute(
+                    statement.where(condition if used_up else ~condition).values(status=status, **values),
+                    execution_options={"synchronize_session": False},
+                )
+
+        self.db.commit()
+
+    def delete_finished_before(self, cutoff: datetime) -> int:
+        deleted = self.db.execute(
+            delete(TransactionNotification).where(
+                TransactionNotification.status.in_([NotificationStatus.SENT, NotificationStatus.FAILED]),
+                TransactionNotification.updated_at < cutoff,
+            )
+        ).rowcount
+        self.db.commit()
+
+        return deleted
+
+
+__all__ = [
+    "TransactionNotificationRepository"
+]
@@ -1,13 +1,19 @@
 import uuid
 from datetime import date, datetime
-from typing import Optional
+from decimal import Decimal
+from typing import Iterator, Optional
 
-from sqlalchemy import desc, asc, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, asc, or_, select, union_all, case, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
 
-from app.models.enums import TransactionStatus
+from app.models.enums import BankTypes, TransactionStatus
 from app.models.transaction.transaction import Transaction
 from app.repo.base import BaseRepository
+from app.repo.transaction.notification_repository import TransactionNotificationRepository
+
+
+BULK_INSERT_CHUNK_SIZE = 1000
 
 
 class TransactionRepository(BaseRepository[Transaction]):
@@ -45,34 +51,105 @@ class TransactionRepository(BaseRepository[Transaction]):
             account: str,
             date_from: Optional[date] = None
     ):
-        query = self.db.query(Transaction)
-        query = query.filter(
+        return self.get_by_accounts(accounts=[account], date_from=date_from)
+
+    @staticmethod
+    def _by_accounts(
+            accounts: list,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None
+    ):
+        """
+        Transactions sent from or received by any of the accounts.
+
+        Written as a UNION ALL of two range scans over the (account,
+        document_date) indexes instead of an OR; the receiver branch skips rows
+        the sender branch already returned.
+        """
+        sent = select(Transaction).where(Transaction.sender_account.in_(accounts))
+        received = select(Transaction).where(
+            Transaction.receiver_account.in_(accounts),
             or_(
-                Transaction.sender_account == account,
-                Transaction.receiver_account == account
+                Transaction.sender_account.is_(None),
+                Transaction.sender_account.not_in(accounts)
             )
         )
         if date_from:
-            query = query.filter(Transaction.document_date >= date_from)
-            return query.order_by(asc(Transaction.document_date)).all()
-        return query.order_by(desc(Transaction.document_date)).all()
+            sent = sent.where(Transaction.document_date >= date_from)
+            received = received.where(Transaction.document_date >= date_from)
+        if date_to:
+            sent = sent.where(Transaction.document_date < date_to)
+            received = received.where(Transaction.document_date < date_to)
+
+        return aliased(Transaction, union_all(sent, received).subquery())
 
     def get_by_accounts(
             self,
             accounts: list,
             date_from: Optional[date] = None
     ) -> list[type[Transaction]]:
-        query = self.db.query(Transaction)
-        query = query.filter(
-            or_(
-                Transaction.sender_account.in_(accounts),
-                Transaction.receiver_account.in_(accounts)
-            )
-        )
-        if date_from:
-            query = query.filter(Transaction.document_date >= date_from)
-            return query.order_by(asc(Transaction.document_date)).all()
-        return query.order_by(desc(Transaction.document_date)).all()
+        if not accounts:
+            return []
+
+        transaction = self._by_accounts(accounts, date_from)
+        order = asc(transaction.document_date) if date_from else desc(transaction.document_date)
+
+        return list(self.db.scalars(select(transaction).order_by(order)).all())
+
+    def stream_by_account(
+            self,
+            account_number: str,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            batch_size: int = 1000
+    ) -> Iterator[Transaction]:
+        """Oldest first, fetched from a server-side cursor ``batch_size`` rows at a time."""
+        transaction = self._by_accounts([account_number], date_from, date_to)
+        statement = select(transaction).order_by(asc(transaction.document_date), asc(transaction.id))
+
+        yield from self.db.scalars(statement, execution_options={"yield_per": batch_size})
+
+    def get_account_turnover(
+            self,
+            account_number: str,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None
+    ) -> tuple[Decimal, Decimal]:
+        """Incoming and outgoing totals of the account, summed by the database."""
+        transaction = self._by_accounts([account_number], date_from, date_to)
+        is_income = transaction.receiver_account == account_number
+
+        income, outcome = self.db.execute(select(
+            func.coalesce(func.sum(case((is_income, transaction.payment_amount), else_=0)), 0),
+            func.coalesce(func.sum(case((is_income, 0), else_=transaction.payment_amount)), 0),
+        )).one()
+
+        return Decimal(income), Decimal(outcome)
+
+    def get_by_keys(self, keys: list[tuple[uuid.UUID, datetime]]) -> list[Transaction]:
+        """Transactions by (id, document_date), oldest first; the dates let the lookup skip partitions."""
+        if not keys:
+            return []
+
+        dates = [document_date for _, document_date in keys]
+        statement = select(Transaction).where(
+            tuple_(Transaction.id, Transaction.document_date).in_(keys),
+            Transaction.document_date.between(min(dates), max(dates)),
+        ).order_by(asc(Transaction.document_date), asc(Transaction.id))
+
+        return list(self.db.scalars(statement))
+
+    def has_account_transactions(self, accounts: list, date_from: Optional[date] = None) -> bool:
+        """
+        Whether any of the accounts sent or received anything. Matched by
+        account number, so transfers stored by the counterparty's sync count
+        too.
+        """
+        if not accounts:
+            return False
+
+        transaction = self._by_accounts(accounts, date_from)
+        return self.db.scalar(select(transaction.id).limit(1)) is not None
 
     def get_status(self, id: uuid.UUID) -> TransactionStatus:
         return self.db.query(Transaction).filter(Transaction.id == id).first().status
@@ -87,17 +164,44 @@ class TransactionRepository(BaseRepository[Transaction]):
             Transaction.sender_inn == sender_inn
         ).order_by(desc(Transaction.created_at)).all()
 
-    def get_non_existing_transaction_ids(self, transaction_ids: list[str]) -> list[str]:
-        existing = self.db.query(Transaction.transaction_id).filter(
+    def get_non_existing_transaction_ids(
+            self,
+            transaction_ids: list[str],
+            bank_type: Optional[BankTypes] = None
+    ) -> list[str]:
+        query = self.db.query(Transaction.transaction_id).filter(
             Transaction.transaction_id.in_(transaction_ids)
-        ).all()
-        existing_ids = {row[0] for row in existing}
+        )
+        if bank_type:
+            query = query.filter(Transaction.bank_type == bank_type)
+        existing_ids = {row[0] for row in query.all()}
         return [tid for tid in transaction_ids if tid not in existing_ids]
 
     def bulk_create(self, transactions_data: list[dict]) -> list[Transaction]:
-        transactions = [Transaction(**data) for data in transactions_data]
-
-        self.db.add_all(transactions)
+        """
+        Insert transactions in chunks, skipping ones that already exist for
+        the same bank. Only the rows that were actually inserted are returned,
+        and those are queued for Telegram notification in the same commit.
+        """
+        if not transactions_data:
+            return []
+
+        for item in transactions_data:
+            if 'transaction_id' not in item:
+                raise ValueError("transaction_id is required for bulk_create")
+
+        transactions = []
+        for start in range(0, len(transactions_data), BULK_INSERT_CHUNK_SIZE):
+            chunk = transactions_data[start:start + BULK_INSERT_CHUNK_SIZE]
+
+            statement = insert(Transaction).values(chunk).on_conflict_do_nothing(
+                constraint="uq_transactions_bank_transaction_id"
+            ).returning(Transaction)
+
+            result = self.db.execute(statement)
+            transactions.extend(result.scalars().all())
+
+        TransactionNotificationRepository(self.db).enqueue(transactions)
         self.db.commit()
 
         return transactions
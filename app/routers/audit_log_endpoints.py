@@ -1,25 +1,71 @@
-from typing import List
+import base64
+import uuid
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from starlette import status
 
 from app.dependencies import get_audit_repository
+from app.models import ActionCategory
 from app.repo import AuditLogRepository
 from app.schemas.responses.models.transaction_responses import AuditLogResponse
 
 router = APIRouter(prefix="/audit-logs", tags=["Audit Logs"])
 
 
+def _encode_cursor(created_at: datetime, log_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{log_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(log_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
 @router.get("/", response_model=List[AuditLogResponse])
 def get_all_audit_logs(
+        response: Response,
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=500),
+        category: Optional[ActionCategory] = None,
+        action: Optional[str] = None,
+        user_id: Optional[uuid.UUID] = None,
+        admin_id: Optional[uuid.UUID] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        expand: bool = Query(False, description="Include user and admin details"),
         audit_repo: AuditLogRepository = Depends(get_audit_repository)
 ):
-    """Get recent audit logs across all transactions (paginated)."""
-    logs = audit_repo.get_recent_logs(limit)
+    """
+    Get audit logs, newest first.
+
+    The X-Next-Cursor response header is set while more logs are available;
+    pass it back as ``cursor`` to get the next page.
+    """
+    logs = audit_repo.get_page(
+        category=category,
+        action=action,
+        user_id=user_id,
+        admin_id=admin_id,
+        date_from=date_from,
+        date_to=date_to,
+        after=_decode_cursor(cursor) if cursor else None,
+        skip=skip,
+        limit=limit + 1,
+        expand=expand,
+    )
 
-    if skip > 0:
-        logs = logs[skip:]
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(logs[-1].created_at, logs[-1].id)
 
     return logs
 
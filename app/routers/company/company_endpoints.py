@@ -1,18 +1,30 @@
 import logging
 import uuid
-from typing import List
+from datetime import date
+from tempfile import SpooledTemporaryFile
+from typing import List, Optional
+from urllib.parse import quote
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from starlette import status
 
 from app.core.redis import get_redis_client
-from app.db import get_db
+from app.db import get_db, get_db_session
 from app.dependencies import get_company_repository
-from app.repo import CompanyRepository
+from app.repo import BankAccountRepository, CompanyRepository
 from app.schemas import CompanyCreate
 from app.schemas.responses import CompanyResponse, CompanyListResponse
 from app.services.gnk_api_service import GNKAPIService
+from app.services.integrate_bank import clear_cached_credentials, credentials_version_key
+from app.utils.statement_export import (
+    STATEMENT_FORMATS,
+    STATEMENT_MEDIA_TYPES,
+    iter_statement_csv,
+    statement_filename,
+    write_statement_xlsx,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -140,6 +152,75 @@ def get_company(
     )
 
 
+def _read_chunks(file, chunk_size: int = 64 * 1024):
+    with file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def _stream_statement_csv(company_id: uuid.UUID, account_number: Optional[str], date_from: date, date_to: date):
+    # the request session is closed before the body is streamed, so the rows get their own
+    with get_db_session() as db:
+        company = CompanyRepository(db).get_by_id(company_id)
+        bank_accounts = _statement_accounts(db, company_id, account_number)
+        yield from iter_statement_csv(db, company.name, bank_accounts, date_from, date_to)
+
+
+def _statement_accounts(db: Session, company_id: uuid.UUID, account_number: Optional[str]) -> list:
+    bank_accounts = BankAccountRepository(db).get_by_company_id(company_id)
+    if account_number:
+        bank_accounts = [account for account in bank_accounts if account.account_number == account_number]
+    return bank_accounts
+
+
+@router.get("/{company_id}/statement")
+def export_company_statement(
+        company_id: uuid.UUID,
+        date_from: date,
+        date_to: date,
+        file_format: str = Query("xlsx", alias="format", pattern=f"^({'|'.join(STATEMENT_FORMATS)})$"),
+        account_number: Optional[str] = None,
+        db: Session = Depends(get_db),
+):
+    """Export the statement of the company's bank accounts for a period as XLSX or CSV."""
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must not be after date_to"
+        )
+
+    company = CompanyRepository(db).get_by_id(company_id)
+    if not company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with ID {company_id} not found"
+        )
+
+    bank_accounts = _statement_accounts(db, company_id, account_number)
+    if not bank_accounts:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No bank accounts found for company {company_id}"
+        )
+
+    filename = statement_filename(company.name, date_from, date_to, file_format)
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    media_type = STATEMENT_MEDIA_TYPES[file_format]
+
+    if file_format == "csv":
+        return StreamingResponse(
+            _stream_statement_csv(company_id, account_number, date_from, date_to),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    output = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    write_statement_xlsx(db, company.name, bank_accounts, date_from, date_to, output)
+    output.seek(0)
+
+    return StreamingResponse(_read_chunks(output), media_type=media_type, headers=headers)
+
+
 @router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_company(
         company_id: uuid.UUID,
@@ -153,6 +234,8 @@ def delete_company(
     redis_client.delete(f"kapitalbank:{company_id}:tokens")
     redis_client.delete(f"kapitalbank:{company_id}:credentials")
     redis_client.delete(f"kapitalbank:{company_id}:business_info")
+    redis_client.incr(credentials_version_key(company_id))
+    clear_cached_credentials(company_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
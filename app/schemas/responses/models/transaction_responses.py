@@ -6,6 +6,7 @@ from pydantic import BaseModel, Field, ConfigDict
 
 from app.models import ActionCategory
 from app.models.transaction.transaction import TransactionStatus
+from app.schemas.responses.models.user_responses import UserResponse
 
 
 class TransactionResponse(BaseModel):
@@ -85,19 +86,32 @@ class MissingFieldsResponse(BaseModel):
     })
 
 
+class AuditLogAdminResponse(BaseModel):
+    """Schema for the admin attached to an audit log entry."""
+    id: uuid.UUID = Field(..., description="Admin ID")
+    email: str = Field(..., description="Admin email")
+    telegram_id: Optional[str] = Field(None, description="Admin Telegram ID")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class AuditLogResponse(BaseModel):
     """Schema for returning audit log entries."""
     id: uuid.UUID = Field(..., description="Audit log ID")
-    user_id: uuid.UUID = Field(..., description="The ID of the user who performed the action")
+    user_id: Optional[uuid.UUID] = Field(None, description="The ID of the user who performed the action")
+    admin_id: Optional[uuid.UUID] = Field(None, description="The ID of the admin who performed the action")
     category: ActionCategory = Field(..., description="Category of the action")
     action: str = Field(..., description="Action performed (e.g., 'created_otp', 'logged_in', 'company_create')")
     payload: Optional[dict] = Field(None, description="Detailed JSON payload of the changes")
     created_at: datetime = Field(..., description="Log creation timestamp")
+    user: Optional[UserResponse] = Field(None, description="User details, only with expand")
+    admin: Optional[AuditLogAdminResponse] = Field(None, description="Admin details, only with expand")
 
     model_config = ConfigDict(from_attributes=True, json_schema_extra={
         "example": {
             "id": "123e4567-e89b-12d3-a456-426614174000",
             "user_id": "123e4567-e89b-12d3-a456-426614174001",
+            "admin_id": None,
             "category": "web",
             "action": "company_create",
             "payload": {"company_name": "ABC Company", "registration_number": "12345"},
@@ -129,6 +143,7 @@ __all__ = [
     "TransactionResponse",
     "TransactionListResponse",
     "MissingFieldsResponse",
+    "AuditLogAdminResponse",
     "AuditLogResponse",
     "TransactionStatsResponse"
 ]
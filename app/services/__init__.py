@@ -1,2 +1,4 @@
 from .integrate_bank import *
 from .cache import *
+from .audit_log import *
+from .telegram import *
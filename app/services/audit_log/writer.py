@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from typing import Optional, Dict, Any
+
+from app.admin import AdminUser
+from app.core.configs import settings
+from app.db import get_db_session
+from app.models import Actions, User
+from app.repo import AuditLogRepository
+
+logger = logging.getLogger(__name__)
+
+_audit_log_writer: Optional["AuditLogWriter"] = None
+
+
+class AuditLogWriter:
+    """
+    Buffers audit log entries in memory and writes them in batches, so
+    handlers don't wait for an INSERT and a commit.
+
+    A batch is flushed every ``flush_interval`` seconds or as soon as
+    ``batch_size`` entries are queued, and ``close`` flushes whatever is
+    left. With ``sync`` enabled every entry is written immediately.
+    """
+
+    def __init__(
+            self,
+            flush_interval: float = 2.0,
+            batch_size: int = 100,
+            max_buffer_size: int = 10000,
+            sync: bool = False,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer_size = max_buffer_size
+        self.sync = sync
+        self._buffer: list[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+
+    def log(
+            self,
+            action: Actions,
+            user: Optional[User] = None,
+            admin: Optional[AdminUser] = None,
+            payload: Optional[Dict[str, Any]] = None
+    ) -> None:
+        entry = AuditLogRepository.build_entry(action, user=user, admin=admin, payload=payload)
+
+        if self.sync:
+            self._write([entry])
+            return
+
+        if len(self._buffer) >= self.max_buffer_size:
+            logger.warning(f"Audit log buffer is full, dropping entry {action}")
+            return
+
+        self._buffer.append(entry)
+        self._ensure_timer()
+
+        if len(self._buffer) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _ensure_timer(self) -> None:
+        if self._timer_task is None or self._timer_task.done():
+            self._timer_task = asyncio.get_running_loop().create_task(self._run_timer())
+
+    async def _run_timer(self) -> None:
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+
+        entries, self._buffer = self._buffer, []
+
+        try:
+            return await asyncio.to_thread(self._write, entries)
+        except Exception as e:
+            logger.error(f"❌ Failed to write {len(entries)} audit log entries: {e}", exc_info=True)
+            # keep them for the next flush unless that would overflow the buffer
+            self._buffer[:0] = entries[:max(self.max_buffer_size - len(self._buffer), 0)]
+            return 0
+
+    @staticmethod
+    def _write(entries: list[Dict[str, Any]]) -> int:
+        with get_db_session() as db:
+            return AuditLogRepository(db).create_many(entries)
+
+    async def close(self) -> None:
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            self._timer_task = None
+
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        written = await self.flush()
+        if written:
+            logger.info(f"Flushed {written} audit log entries on shutdown")
+
+
+def get_audit_log_writer() -> AuditLogWriter:
+    global _audit_log_writer
+
+    if _audit_log_writer is None:
+        _audit_log_writer = AuditLogWriter(
+            flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+            batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+            sync=settings.AUDIT_LOG_SYNC,
+        )
+
+    return _audit_log_writer
+
+
+async def close_audit_log_writer() -> None:
+    if _audit_log_writer is not None:
+        await _audit_log_writer.close()
+
+
+__all__ = [
+    "AuditLogWriter",
+    "get_audit_log_writer",
+    "close_audit_log_writer",
+]
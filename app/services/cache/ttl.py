@@ -0,0 +1,55 @@
+import time
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry.
+
+    Used to keep hot Redis values (tokens, business info, device ids) in
+    memory for the duration of a sync run instead of re-reading them on
+    every request.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if len(self._data) >= self.max_size and key not in self._data:
+            self._evict()
+
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+
+        if len(self._data) >= self.max_size:
+            oldest = min(self._data, key=lambda key: self._data[key][0])
+            del self._data[oldest]
+
+
+__all__ = [
+    "TTLCache",
+]
@@ -2,88 +2,320 @@ import asyncio
 import hashlib
 import json
 import logging
+import random
+import time
 import uuid
+import weakref
+from datetime import datetime
 from decimal import Decimal
 from typing import Optional
+from zoneinfo import ZoneInfo
 
 import httpx
+from redis.exceptions import LockError
 from sqlalchemy.orm import Session
 
 from app.core.configs import settings
-from app.core.redis import get_redis_client
-from app.models import BankTypes, Transaction
-from app.repo import BankAccountRepository
+from app.core.http import get_http_client
+from app.core.redis import get_async_redis_client
+from app.core.throttling import RedisTokenBucket
+from app.models import BankTypes, BankSyncState, Transaction, UNKNOWN_DOCUMENT_DATE
+from app.repo import BankAccountRepository, BankSyncStateRepository
 from app.repo.transaction import TransactionRepository
+from app.services.cache.ttl import TTLCache
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+_credentials_cache = TTLCache(ttl=settings.KAPITALBANK_CACHE_TTL)
+
+# asyncio locks are bound to the loop they first wait on, so keep one set per loop
+_refresh_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[uuid.UUID, asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_refresh_lock(company_id: uuid.UUID) -> asyncio.Lock:
+    locks = _refresh_locks.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(company_id)
+
+    if lock is None:
+        lock = asyncio.Lock()
+        locks[company_id] = lock
+
+    return lock
+
+
+def clear_cached_credentials(company_id: uuid.UUID) -> None:
+    for name in ("device", "tokens", "payload", "business_info", "version"):
+        _credentials_cache.delete(f"kapitalbank:{company_id}:{name}")
+
+
+def credentials_version_key(company_id: uuid.UUID) -> str:
+    """Bumped in Redis whenever a company's credentials change, to invalidate other processes' caches."""
+    return f"kapitalbank:{company_id}:version"
+
 
 class Kapitalbank:
     def __init__(self, company_id: uuid.UUID, db: Optional[Session] = None) -> None:
-        self.redis_client = get_redis_client()
         self.company_id = company_id
         self.db = db
-        self.device_id = self.redis_client.get(f"kapitalbank:{company_id}:device")
-
-        if self.device_id is None:
-            self.device_id = self._generate_device_id()
-            self.redis_client.setex(name=f"kapitalbank:{company_id}:device", value=self.device_id, time=30 * 24 * 3600)
+        self.device_id: Optional[str] = None
 
         self.user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
+        self.rate_limiter = RedisTokenBucket(
+            key="kapitalbank",
+            rate=settings.KAPITALBANK_RATE_LIMIT,
+            capacity=settings.KAPITALBANK_RATE_BURST,
+        )
+        self._business_rate_limiters: dict[str, RedisTokenBucket] = {}
+        self._base_headers: Optional[dict] = None
+        self._cache_validated = False
+
+    @property
+    def redis_client(self):
+        return get_async_redis_client()
+
+    def _cache_key(self, name: str) -> str:
+        return f"kapitalbank:{self.company_id}:{name}"
+
+    async def _get_cached(self, name: str):
+        """
+        Value from the process cache, checked against the Redis version once
+        per instance so that changes made by another process evict it.
+        """
+        if not self._cache_validated:
+            version = await self.redis_client.get(credentials_version_key(self.company_id)) or "0"
+            if _credentials_cache.get(self._cache_key("version")) != version:
+                clear_cached_credentials(self.company_id)
+                _credentials_cache.set(self._cache_key("version"), version)
+            self._cache_validated = True
+
+        return _credentials_cache.get(self._cache_key(name))
+
+    async def _bump_version(self) -> None:
+        version = str(await self.redis_client.incr(credentials_version_key(self.company_id)))
+        _credentials_cache.set(self._cache_key("version"), version)
+
+    def _cache_tokens(self, tokens: dict) -> None:
+        # never keep a token in memory past its own expiry
+        ttl = settings.KAPITALBANK_CACHE_TTL
+        if tokens.get("expires_at") is not None:
+            ttl = min(ttl, tokens["expires_at"] - time.time())
+
+        if ttl > 0:
+            _credentials_cache.set(self._cache_key("tokens"), tokens, ttl=ttl)
+
+    async def _on_unauthorized(self) -> None:
+        logger.warning(f"Kapitalbank rejected the token of company {self.company_id}, dropping cached credentials")
+        clear_cached_credentials(self.company_id)
+        self._cache_validated = False
 
     def _generate_device_id(self):
         generated = hashlib.md5(str(uuid.getnode()).encode()).hexdigest()
         return generated
 
+    async def _get_device_id(self) -> str:
+        if self.device_id is not None:
+            return self.device_id
+
+        cache_key = self._cache_key("device")
+        device_id = await self._get_cached("device")
+
+        if device_id is None:
+            device_id = await self.redis_client.get(cache_key)
+
+            if device_id is None:
+                device_id = self._generate_device_id()
+                await self.redis_client.setex(name=cache_key, value=device_id, time=30 * 24 * 3600)
+
+            _credentials_cache.set(cache_key, device_id)
+
+        self.device_id = device_id
+        return device_id
+
     async def headers(self, auth_required: bool = False, x_api_version: float = 2.0) -> dict:
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "ru-RU",
-            "Content-Language": "ru",
-            "Origin": "https://b2b.kapitalbank.uz",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-site",
-            "User-Agent": self.user_agent,
-            "x-api-version": f"{x_api_version}",
-            "x-device-info": f"{self.user_agent} {self.device_id}",
-            "x-user-app": "name=Uzum Business;version=2.2.0",
-            "x-user-device": f"id={self.device_id};type=Desktop;name=Chrome",
-            "x-user-os": "name=Windows;version=10",
-        }
+        if self._base_headers is None:
+            device_id = await self._get_device_id()
+            self._base_headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json, text/plain, */*",
+                "Accept-Language": "ru-RU",
+                "Content-Language": "ru",
+                "Origin": "https://b2b.kapitalbank.uz",
+                "Sec-Fetch-Dest": "empty",
+                "Sec-Fetch-Mode": "cors",
+                "Sec-Fetch-Site": "same-site",
+                "User-Agent": self.user_agent,
+                "x-device-info": f"{self.user_agent} {device_id}",
+                "x-user-app": "name=Uzum Business;version=2.2.0",
+                "x-user-device": f"id={device_id};type=Desktop;name=Chrome",
+                "x-user-os": "name=Windows;version=10",
+            }
+
+        headers = {**self._base_headers, "x-api-version": f"{x_api_version}"}
+
         if auth_required:
-            token_key = f"kapitalbank:{self.company_id}:tokens"
-            cached_token = self.redis_client.get(token_key)
-            logger.info(cached_token)
-            if cached_token is None:
-                token = await self._refresh_tokens()
-                logger.info(token)
-                headers["Authorization"] = f"Bearer {token.get('access_token')}"
-                return headers
-
-            cached_data = json.loads(cached_token)
-            logger.info(cached_data)
-            if not cached_data or not cached_data.get('access_token'):
-                raise ValueError("Invalid authentication tokens. Please authenticate again.")
-            headers["Authorization"] = f"Bearer {cached_data.get('access_token')}"
+            tokens = await self._get_tokens()
+            if tokens is None or (self._expires_soon(tokens) and not await self._refresh_on_hold(tokens)):
+                tokens = await self._refresh_tokens(current=tokens)
+
+            headers["Authorization"] = f"Bearer {tokens.get('access_token')}"
         return headers
 
-    async def _refresh_tokens(self):
+    @staticmethod
+    def _expires_soon(tokens: dict) -> bool:
+        expires_at = tokens.get("expires_at")
+        if expires_at is None:
+            return False
+
+        return expires_at - time.time() < settings.KAPITALBANK_TOKEN_REFRESH_MARGIN
+
+    @staticmethod
+    def _is_expired(tokens: dict) -> bool:
+        expires_at = tokens.get("expires_at")
+        return expires_at is not None and expires_at <= time.time()
+
+    async def _refresh_on_hold(self, tokens: Optional[dict]) -> bool:
+        """
+        True while a recent proactive refresh failed and the current token
+        still works: don't call /auth again until the cooldown is over.
+        """
+        if not tokens or not tokens.get("access_token") or self._is_expired(tokens):
+            return False
+
+        cache_key = self._cache_key("refresh_failed")
+        if _credentials_cache.get(cache_key) is not None:
+            return True
+
+        ttl = await self.redis_client.ttl(cache_key)
+        if ttl is None or ttl <= 0:
+            return False
+
+        _credentials_cache.set(cache_key, True, ttl=ttl)
+        return True
+
+    async def _hold_refresh(self) -> None:
+        cooldown = settings.KAPITALBANK_REFRESH_RETRY_INTERVAL
+        cache_key = self._cache_key("refresh_failed")
+
+        await self.redis_client.setex(cache_key, cooldown, "1")
+        _credentials_cache.set(cache_key, True, ttl=cooldown)
 
-        credentials = self._get_credentials()
+    async def _release_refresh_hold(self) -> None:
+        cache_key = self._cache_key("refresh_failed")
+
+        await self.redis_client.delete(cache_key)
+        _credentials_cache.delete(cache_key)
+
+    async def _get_tokens(self) -> Optional[dict]:
+        tokens = await self._get_cached("tokens")
+
+        if tokens is None:
+            tokens = await self._load_tokens()
+            if tokens is None:
+                return None
+
+            self._cache_tokens(tokens)
+
+        return tokens
+
+    async def _load_tokens(self) -> Optional[dict]:
+        cache_key = self._cache_key("tokens")
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            cached_token, ttl = await pipe.get(cache_key).ttl(cache_key).execute()
+
+        if cached_token is None:
+            return None
+
+        tokens = json.loads(cached_token)
+        if not tokens or not tokens.get("access_token"):
+            raise ValueError("Invalid authentication tokens. Please authenticate again.")
+
+        if "expires_at" not in tokens and ttl and ttl > 0:
+            tokens["expires_at"] = time.time() + ttl
+
+        return tokens
+
+    async def _set_tokens(self, data: dict) -> None:
+        cache_key = self._cache_key("tokens")
+        data = {**data, "expires_at": time.time() + settings.KAPITALBANK_TOKEN_TTL}
+
+        await self.redis_client.setex(cache_key, settings.KAPITALBANK_TOKEN_TTL, json.dumps(data))
+        await self._bump_version()
+        await self._release_refresh_hold()
+        self._cache_tokens(data)
+
+    async def _refresh_tokens(self, current: Optional[dict] = None) -> dict:
+        """
+        Single-flight token refresh.
+
+        Concurrent callers in this process wait on an asyncio lock and other
+        workers wait on a Redis lock; whoever gets in first re-authenticates
+        and everyone else reuses the tokens it saved.
+        """
+        stale_token = current.get("access_token") if current else None
+
+        async with _get_refresh_lock(self.company_id):
+            tokens = await self._load_tokens()
+            if self._is_fresh(tokens, stale_token):
+                self._cache_tokens(tokens)
+                return tokens
+
+            lock = self.redis_client.lock(
+                self._cache_key("refresh_lock"),
+                timeout=settings.KAPITALBANK_REFRESH_LOCK_TIMEOUT,
+                blocking_timeout=settings.KAPITALBANK_REFRESH_LOCK_TIMEOUT,
+            )
+            try:
+                async with lock:
+                    tokens = await self._load_tokens()
+                    if self._is_fresh(tokens, stale_token):
+                        self._cache_tokens(tokens)
+                        return tokens
+
+                    # another caller's refresh failed while this one waited for the lock
+                    if await self._refresh_on_hold(current):
+                        return current
+
+                    result = await self._authenticate()
+            except LockError:
+                raise ValueError("Timed out waiting for Kapitalbank token refresh")
+
+        if result.get("access_token"):
+            return result
+
+        if current and current.get("access_token") and not self._is_expired(current):
+            logger.warning(
+                f"Proactive token refresh failed for company {self.company_id}: "
+                f"{result.get('message', 'confirmation required')}, using current token "
+                f"for the next {settings.KAPITALBANK_REFRESH_RETRY_INTERVAL}s"
+            )
+            await self._hold_refresh()
+            return current
+
+        raise ValueError("Invalid authentication tokens. Please authenticate again.")
+
+    def _is_fresh(self, tokens: Optional[dict], stale_token: Optional[str]) -> bool:
+        return (
+                tokens is not None
+                and tokens.get("access_token") != stale_token
+                and not self._expires_soon(tokens)
+        )
+
+    async def _authenticate(self) -> dict:
+        credentials = await self._get_credentials()
 
         if credentials is None:
             raise ValueError("Credentials not found. Please authenticate first.")
 
-        try:
-            if isinstance(credentials, str):
-                payload = json.loads(credentials)
-            else:
-                payload = credentials
-        except Exception as e:
-
-            raise
+        if isinstance(credentials, str):
+            payload = json.loads(credentials)
+        else:
+            payload = credentials
 
         data = await self.auth(login=payload.get("login"), password=payload.get("password"), confirm_type=0)
 
@@ -94,9 +326,9 @@ class Kapitalbank:
             headers = await self.headers()
             payload = {"login": str(login).strip(), "password": str(password).strip(), "confirmType": confirm_type}
 
-            current_creds = self._get_credentials()
+            current_creds = await self._get_credentials()
             if not current_creds:
-                self._save_credentials(login, password)
+                await self._save_credentials(login, password)
 
             response_data = await self._make_auth_request(payload, headers)
 
@@ -115,12 +347,12 @@ class Kapitalbank:
     async def _make_auth_request(self, payload: dict, headers: dict) -> dict:
         url = f"{settings.KAPITALBANK_URL}/auth"
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                url=url,
-                json=payload,
-                headers=headers
-            )
+        client = get_http_client()
+        response = await client.post(
+            url=url,
+            json=payload,
+            headers=headers
+        )
 
         if response.status_code != 200 and response.json().get("error"):
             error_msg = response.json().get("error")
@@ -139,14 +371,14 @@ class Kapitalbank:
         if need_confirm and confirm_token:
 
             if confirm_type == 0:
-                return self._create_confirmation_session(result, login, password, confirm_phone)
+                return await self._create_confirmation_session(result, login, password, confirm_phone)
 
-        return self._save_auth_tokens(result)
+        return await self._save_auth_tokens(result)
 
-    def _create_confirmation_session(self, result: dict, login: str, password: str, confirm_phone: str) -> dict:
+    async def _create_confirmation_session(self, result: dict, login: str, password: str, confirm_phone: str) -> dict:
         session_id = str(uuid.uuid4())
 
-        self.redis_client.setex(
+        await self.redis_client.setex(
             session_id,
             65,
             json.dumps({
@@ -165,42 +397,49 @@ class Kapitalbank:
             "confirm_phone": confirm_phone,
         }
 
-    def _save_auth_tokens(self, result: dict) -> dict:
+    async def _save_auth_tokens(self, result: dict) -> dict:
         data = {
             "user_id": result.get("userId"),
             "access_token": result.get("accessToken"),
             "refresh_token": result.get("refreshToken"),
         }
-        cache_key = f"kapitalbank:{self.company_id}:tokens"
-        self.redis_client.setex(cache_key, 12 * 60 * 60, json.dumps(data))
+        await self._set_tokens(data)
 
         return data
 
-    def _save_credentials(self, login, password):
+    async def _save_credentials(self, login, password):
 
         data = {
             "login": str(login).strip(),
             "password": str(password).strip(),
         }
-        cache_key = f"kapitalbank:{self.company_id}:payload"
-        self.redis_client.set(cache_key, json.dumps(data))
+        cache_key = self._cache_key("payload")
+        await self.redis_client.set(cache_key, json.dumps(data))
+        await self._bump_version()
+        _credentials_cache.set(cache_key, data)
 
         return data
 
-    def _get_credentials(self):
-        cache_key = f"kapitalbank:{self.company_id}:payload"
-        cached_data = self.redis_client.get(cache_key)
+    async def _get_credentials(self):
+        cache_key = self._cache_key("payload")
+        credentials = await self._get_cached("payload")
+        if credentials is not None:
+            return credentials
+
+        cached_data = await self.redis_client.get(cache_key)
 
         if cached_data:
-            return json.loads(cached_data)
+            credentials = json.loads(cached_data)
+            _credentials_cache.set(cache_key, credentials)
+            return credentials
 
         return None
 
     async def confirm_by_otp(self, code: str, session_id: str):
         try:
-            cached_data = self._get_session_data(session_id)
+            cached_data = await self._get_session_data(session_id)
             result = await self._send_otp_confirmation(code, cached_data)
-            self._save_confirmation_tokens(result, cached_data)
+            await self._save_confirmation_tokens(result, cached_data)
             return {"success": True, "message": "Confirmed successfully"}
         except ValueError as e:
 
@@ -215,9 +454,9 @@ class Kapitalbank:
 
             return {"success": False, "message": f"Unexpected error: {str(e)}"}
 
-    def _get_session_data(self, session_id: str) -> dict:
+    async def _get_session_data(self, session_id: str) -> dict:
 
-        cached = self.redis_client.get(session_id)
+        cached = await self.redis_client.get(session_id)
         if not cached:
             raise ValueError("Session expired")
         return json.loads(cached)
@@ -231,14 +470,13 @@ class Kapitalbank:
             "userId": cached_data.get("user_id")
         }
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            headers = await self.headers()
-            response = await client.put(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
+        client = get_http_client()
+        headers = await self.headers()
+        response = await client.put(
+            url,
+            json=payload,
+            headers=headers
+        )
 
         if response.status_code != 200:
             raise ValueError("Failed to confirm")
@@ -246,33 +484,31 @@ class Kapitalbank:
         response_data = response.json()
         return response_data.get("result") or {}
 
-    def _save_confirmation_tokens(self, result: dict, cached_data: dict):
-        self.redis_client.set(
-            name=f"kapitalbank:{self.company_id}:tokens",
-            value=json.dumps(result)
-        )
+    async def _save_confirmation_tokens(self, result: dict, cached_data: dict):
         data = {
             "user_id": cached_data.get("user_id"),
             "access_token": result.get("accessToken"),
             "refresh_token": result.get("refreshToken"),
         }
-        self.redis_client.setex(
-            name=f"kapitalbank:{self.company_id}:tokens",
-            time=12 * 60 * 60,
-            value=json.dumps(data)
-        )
+        await self._set_tokens(data)
 
     async def get_business_info(self):
+        cache_key = self._cache_key("business_info")
+        business_info = await self._get_cached("business_info")
+        if business_info is not None:
+            return business_info
 
-        business_info = self.redis_client.get(f"kapitalbank:{self.company_id}:business_info")
-        if business_info:
-            return self._parse_cached_business_info(business_info)
+        cached_data = await self.redis_client.get(cache_key)
+        if cached_data:
+            business_info = self._parse_cached_business_info(cached_data)
+            _credentials_cache.set(cache_key, business_info)
+            return business_info
 
         try:
 
             business_data = await self._fetch_business_info()
 
-            self._cache_business_info(business_data)
+            await self._cache_business_info(business_data)
 
             return {
                 "success": True,
@@ -281,10 +517,10 @@ class Kapitalbank:
             }
         except httpx.TimeoutException:
 
-            return {"success": False, "message": "Request timeout"}
+            return {"success": False, "retryable": True, "message": "Request timeout"}
         except httpx.RequestError as e:
 
-            return {"success": False, "message": f"Request error: {str(e)}"}
+            return {"success": False, "retryable": isinstance(e, httpx.TransportError), "message": f"Request error: {str(e)}"}
         except Exception as e:
 
             return {"success": False, "message": f"Unexpected error: {str(e)}"}
@@ -302,21 +538,27 @@ class Kapitalbank:
         url = f"{settings.KAPITALBANK_URL}/business/list"
 
         headers = await self.headers(auth_required=True)
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(url, headers=headers)
+        client = get_http_client()
+        response = await client.get(url, headers=headers)
+
+        if response.status_code == 401:
+            await self._on_unauthorized()
 
         if response.status_code != 200:
             raise httpx.RequestError("Failed to fetch business info")
 
         return response.json().get("result", [])[0]
 
-    def _cache_business_info(self, business_data: dict):
+    async def _cache_business_info(self, business_data: dict):
+        cache_key = self._cache_key("business_info")
+        cached_data = json.dumps(business_data)
 
-        self.redis_client.setex(
-            name=f"kapitalbank:{self.company_id}:business_info",
+        await self.redis_client.setex(
+            name=cache_key,
             time=30 * 24 * 3600,
-            value=json.dumps(business_data)
+            value=cached_data
         )
+        _credentials_cache.set(cache_key, self._parse_cached_business_info(cached_data))
 
     async def accounts(self):
         business_info = await self.get_business_info()
@@ -337,10 +579,10 @@ class Kapitalbank:
             }
         except httpx.TimeoutException:
 
-            return {"success": False, "message": "Request timeout"}
+            return {"success": False, "retryable": True, "message": "Request timeout"}
         except httpx.RequestError as e:
 
-            return {"success": False, "message": f"Request error: {str(e)}"}
+            return {"success": False, "retryable": isinstance(e, httpx.TransportError), "message": f"Request error: {str(e)}"}
         except Exception as e:
 
             return {"success": False, "message": f"Unexpected error: {str(e)}"}
@@ -355,8 +597,7 @@ class Kapitalbank:
             params = {"pageNumber": page_number, "pageSize": page_size}
             headers = await self.headers(auth_required=True)
 
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.get(url, headers=headers, params=params)
+            response = await self._get_with_retry(url, headers=headers, business_code=business_code, params=params)
 
             if response.status_code != 200:
                 raise httpx.RequestError("Failed to fetch accounts")
@@ -371,7 +612,6 @@ class Kapitalbank:
                 break
 
             page_number += 1
-            await asyncio.sleep(3)
 
         return results
 
@@ -392,7 +632,7 @@ class Kapitalbank:
 
     async def _save_or_update_accounts(self, accounts: list[dict]):
         bank_account_repo = BankAccountRepository(self.db)
-        accounts = bank_account_repo.bulk_create_or_update(accounts)
+        accounts = await asyncio.to_thread(bank_account_repo.bulk_create_or_update, accounts)
         return accounts
 
     async def transactions(self):
@@ -407,41 +647,57 @@ class Kapitalbank:
         try:
 
             transaction_repo = TransactionRepository(self.db)
+            sync_state_repo = BankSyncStateRepository(self.db)
+            sync_state = await asyncio.to_thread(sync_state_repo.get_or_create, self.company_id, BankTypes.KAPITALBANK)
 
             new_transaction_ids = await self._collect_new_transaction_ids(
                 business_code,
                 branch_code,
-                transaction_repo
+                transaction_repo,
+                sync_state_repo,
+                sync_state,
             )
 
             if not new_transaction_ids:
+                await asyncio.to_thread(sync_state_repo.complete, sync_state, pending_transaction_ids=[])
                 return {
                     "success": True,
                     "message": "No new transactions found",
                     "new_transactions": []
                 }
 
-            new_transactions = await self._fetch_and_create_transactions(
+            new_transactions, failed_ids = await self._fetch_and_create_transactions(
                 business_code,
                 branch_code,
                 new_transaction_ids,
                 transaction_repo
             )
+            dropped_ids = await asyncio.to_thread(
+                sync_state_repo.complete,
+                sync_state,
+                pending_transaction_ids=failed_ids,
+                max_attempts=settings.KAPITALBANK_PENDING_MAX_ATTEMPTS,
+            )
+            if dropped_ids:
+                logger.warning(
+                    f"Giving up on {len(dropped_ids)} transactions of company {self.company_id} "
+                    f"after {settings.KAPITALBANK_PENDING_MAX_ATTEMPTS} syncs: {dropped_ids}"
+                )
 
             return {
                 "success": True,
                 "new_transactions": new_transactions,
-                "count": new_transactions
+                "count": len(new_transactions)
             }
 
         except httpx.TimeoutException:
 
             self._handle_db_rollback()
-            return {"success": False, "message": "Request timeout"}
+            return {"success": False, "retryable": True, "message": "Request timeout"}
         except httpx.RequestError as e:
 
             self._handle_db_rollback()
-            return {"success": False, "message": f"Request error: {str(e)}"}
+            return {"success": False, "retryable": isinstance(e, httpx.TransportError), "message": f"Request error: {str(e)}"}
         except Exception as e:
 
             self._handle_db_rollback()
@@ -451,70 +707,254 @@ class Kapitalbank:
             self,
             business_code: str,
             branch_code: str,
-            transaction_repo: TransactionRepository
+            transaction_repo: TransactionRepository,
+            sync_state_repo: BankSyncStateRepository,
+            sync_state: BankSyncState,
     ) -> list[str]:
-
-        new_ids = []
-        page_number = 1
+        """
+        Walk the payment order feed from the newest order down to the
+        watermark of the last completed sync.
+
+        Progress is saved after every page, so a sync that was interrupted
+        resumes from the page it stopped at with the IDs it already collected.
+        """
+        pending = list(sync_state.pending_transaction_ids or [])
+        # orders stored by an interrupted run are still listed as pending
+        seen = set(pending)
+        new_ids = await asyncio.to_thread(
+            transaction_repo.get_non_existing_transaction_ids, pending, BankTypes.KAPITALBANK
+        ) if pending else []
+
+        # read the watermark once: the state expires on every commit and a reload would block the loop
+        watermark_id = sync_state.last_transaction_id
+        has_watermark = watermark_id is not None
+        watermark_date = self._as_aware(sync_state.last_document_date)
+
+        page_number = sync_state.cursor_page or 1
         page_size = 100
 
         while True:
-
-            url = f"{settings.KAPITALBANK_URL}/business/{business_code}/{branch_code}/paymentOrders/inBank"
-            params = {"pageNumber": page_number, "pageSize": page_size}
-
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.get(
-                    url,
-                    headers=await self.headers(auth_required=True),
-                    params=params
+            response_data = await self._fetch_transaction_page(business_code, branch_code, page_number, page_size)
+            items = [item for item in response_data.get("result", {}).get("items", []) if "id" in item]
+
+            if page_number == 1 and items:
+                await asyncio.to_thread(
+                    sync_state_repo.start_scan,
+                    sync_state,
+                    transaction_id=str(items[0]["id"]),
+                    document_date=self._parse_document_date(items[0].get("provedDate")),
                 )
 
-            if response.status_code != 200:
-                raise httpx.RequestError(f"Failed to fetch transactions: {response.status_code}")
-
-            response_data = response.json()
-            items = response_data.get("result", {}).get("items", [])
-
-            current_ids = [str(item["id"]) for item in items if
-                           "id" in item]  # faqat in out larri olishga if item["direction"] in ["out", "in"]
-            non_existing_ids = transaction_repo.get_non_existing_transaction_ids(current_ids)
-
+            current_ids = []
+            unchecked_ids = []
+            reached_watermark = False
+            for item in items:
+                transaction_id = str(item["id"])
+                document_date = self._parse_document_date(item.get("provedDate"))
+
+                if has_watermark and (
+                        transaction_id == watermark_id
+                        or (document_date and watermark_date and document_date < watermark_date)
+                ):
+                    reached_watermark = True
+                    break
+
+                current_ids.append(transaction_id)
+                if transaction_id in seen:
+                    continue
+
+                # everything strictly newer than the watermark is new; ties and undated orders are checked
+                if not has_watermark or document_date is None or watermark_date is None or document_date <= watermark_date:
+                    unchecked_ids.append(transaction_id)
+                else:
+                    new_ids.append(transaction_id)
+                    seen.add(transaction_id)
+
+            non_existing_ids = await asyncio.to_thread(
+                transaction_repo.get_non_existing_transaction_ids, unchecked_ids, BankTypes.KAPITALBANK
+            ) if unchecked_ids else []
             new_ids.extend(non_existing_ids)
+            seen.update(non_existing_ids)
 
-            if not non_existing_ids or non_existing_ids != current_ids:
-                break
+            # stop at the watermark or, without one, at the first page that has stored orders
+            done = reached_watermark or any(transaction_id not in seen for transaction_id in current_ids)
 
             total_pages = response_data.get("result", {}).get("totalPages", 0)
-            if page_number >= total_pages:
+            if done or not items or page_number >= total_pages:
+                await asyncio.to_thread(sync_state_repo.save_progress, sync_state, None, new_ids)
                 break
 
             page_number += 1
-            await asyncio.sleep(3)
+            await asyncio.to_thread(sync_state_repo.save_progress, sync_state, page_number, new_ids)
 
         return new_ids
 
+    async def _fetch_transaction_page(
+            self,
+            business_code: str,
+            branch_code: str,
+            page_number: int,
+            page_size: int,
+    ) -> dict:
+        url = f"{settings.KAPITALBANK_URL}/business/{business_code}/{branch_code}/paymentOrders/inBank"
+        params = {"pageNumber": page_number, "pageSize": page_size}
+
+        response = await self._get_with_retry(
+            url,
+            headers=await self.headers(auth_required=True),
+            business_code=business_code,
+            params=params
+        )
+
+        if response.status_code != 200:
+            raise httpx.RequestError(f"Failed to fetch transactions: {response.status_code}")
+
+        return response.json()
+
+    @staticmethod
+    def _as_aware(value: Optional[datetime]) -> Optional[datetime]:
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=ZoneInfo(settings.TIMEZONE))
+        return value
+
+    @classmethod
+    def _parse_document_date(cls, value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+
+        try:
+            return cls._as_aware(datetime.fromisoformat(value))
+        except (ValueError, TypeError):
+            return None
+
     async def _fetch_and_create_transactions(
             self,
             business_code: str,
             branch_code: str,
             transaction_ids: list[str],
             transaction_repo: TransactionRepository
-    ) -> list[Transaction]:
+    ) -> tuple[list[Transaction], list[str]]:
+        semaphore = asyncio.Semaphore(settings.KAPITALBANK_CONCURRENCY)
+
+        async def fetch(transaction_id: str) -> tuple[str, Optional[dict]]:
+            async with semaphore:
+                try:
+                    return transaction_id, await self._fetch_transaction_details(
+                        business_code,
+                        branch_code,
+                        transaction_id
+                    )
+                except httpx.HTTPError as e:
+                    logger.warning(f"Skipping transaction for company {self.company_id}: {e}")
+                    return transaction_id, None
+
+        tasks = [asyncio.create_task(fetch(transaction_id)) for transaction_id in transaction_ids]
+
+        new_transactions = []
+        batch = []
+        failed_ids = []
+        try:
+            for future in asyncio.as_completed(tasks):
+                transaction_id, data = await future
+                if data is None:
+                    failed_ids.append(transaction_id)
+                    continue
+                if data["document_date"] == UNKNOWN_DOCUMENT_DATE:
+                    # document_date is part of the unique key, a row stored without it would not
+                    # conflict with the same order once the bank reports its date
+                    logger.info(f"Transaction {transaction_id} of company {self.company_id} has no date yet, leaving it pending")
+                    failed_ids.append(transaction_id)
+                    continue
+                batch.append(data)
+
+                if len(batch) >= settings.TRANSACTION_BATCH_SIZE:
+                    new_transactions.extend(await asyncio.to_thread(transaction_repo.bulk_create, batch))
+                    batch = []
+
+            if batch:
+                new_transactions.extend(await asyncio.to_thread(transaction_repo.bulk_create, batch))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if failed_ids:
+            logger.warning(
+                f"{len(failed_ids)} of {len(transaction_ids)} transactions failed or have no date yet "
+                f"for company {self.company_id}, "
+                f"they will be picked up on the next sync"
+            )
 
-        transactions_data = []
-        for i, transaction_id in enumerate(transaction_ids):
-            transaction_data = await self._fetch_transaction_details(
-                business_code,
-                branch_code,
-                transaction_id
+        return new_transactions, failed_ids
+
+    def _rate_limiters(self, business_code: str) -> list[RedisTokenBucket]:
+        business_limiter = self._business_rate_limiters.get(business_code)
+
+        if business_limiter is None:
+            business_limiter = RedisTokenBucket(
+                key=f"kapitalbank:{business_code}",
+                rate=settings.KAPITALBANK_BUSINESS_RATE_LIMIT,
+                capacity=settings.KAPITALBANK_BUSINESS_RATE_BURST,
             )
-            transactions_data.append(transaction_data)
-            await asyncio.sleep(1)
+            self._business_rate_limiters[business_code] = business_limiter
 
-        new_transactions = transaction_repo.bulk_create(transactions_data)
+        return [self.rate_limiter, business_limiter]
+
+    async def _get_with_retry(
+            self,
+            url: str,
+            headers: dict,
+            business_code: str,
+            params: Optional[dict] = None
+    ) -> httpx.Response:
+        client = get_http_client()
+        limiters = self._rate_limiters(business_code)
+        max_retries = settings.KAPITALBANK_MAX_RETRIES
+
+        for attempt in range(max_retries + 1):
+            for limiter in limiters:
+                await limiter.acquire()
+
+            try:
+                response = await client.get(url, headers=headers, params=params)
+            except httpx.TransportError:
+                if attempt >= max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code == 401:
+                await self._on_unauthorized()
+                return response
+
+            if response.status_code == 429:
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                for limiter in limiters:
+                    await limiter.penalize(retry_after if retry_after is not None else self._retry_delay(attempt))
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= max_retries:
+                return response
+
+            logger.warning(f"Kapitalbank responded {response.status_code} for {url}, retrying")
+
+            if response.status_code != 429:
+                # 429 waits are enforced by the shared limiters on the next acquire
+                await asyncio.sleep(self._retry_delay(attempt))
+
+        return response
+
+    @staticmethod
+    def _parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+        if not retry_after:
+            return None
+
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            return None
 
-        return new_transactions
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        return min(2 ** attempt, 30) + random.uniform(0, 1)
 
     async def _fetch_transaction_details(
             self,
@@ -530,8 +970,7 @@ class Kapitalbank:
         params = {"source": "bank"}
         headers = await self.headers(auth_required=True, x_api_version=4.0)
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(url, headers=headers, params=params)
+        response = await self._get_with_retry(url, headers=headers, business_code=business_code, params=params)
 
         if response.status_code != 200:
             raise httpx.RequestError(f"Failed to fetch transaction {transaction_id}: {response.status_code}")
@@ -549,8 +988,9 @@ class Kapitalbank:
                 document_date = None
 
         return {
+            "bank_type": BankTypes.KAPITALBANK,
             "transaction_id": str(item.get("id", transaction_id)),
-            "document_date": document_date,
+            "document_date": document_date or UNKNOWN_DOCUMENT_DATE,
             "payment_amount": Decimal(item.get("amount", 0)) / 100,
             "currency": item.get("currency", {}).get("alphaCode", "UZS"),
             "receiver_name": item.get("receiverName"),
@@ -573,4 +1013,4 @@ class Kapitalbank:
             self.db.rollback()
 
 
-__all__ = ["Kapitalbank"]
+__all__ = ["Kapitalbank", "clear_cached_credentials", "credentials_version_key"]
@@ -0,0 +1 @@
+from .delivery import *
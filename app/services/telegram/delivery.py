@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import redis
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.types import BufferedInputFile, InputFile, Message
+
+from app.core.configs import settings
+from app.core.redis import get_async_redis_client
+from app.core.throttling import RedisTokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: int
+    success: bool
+    message_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    file_id: Optional[str] = None
+
+
+class TelegramDelivery:
+    """
+    Sends to many chats concurrently within Telegram's limits.
+
+    Every send takes a token from the global bucket and from the chat's own
+    bucket (stricter for groups); both live in Redis so all workers share
+    them. A RetryAfter blocks the chat's bucket for the requested time and
+    the send is retried.
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.max_retries = settings.TELEGRAM_MAX_RETRIES
+        self.rate_limiter = RedisTokenBucket(
+            key="telegram",
+            rate=settings.TELEGRAM_RATE_LIMIT,
+            capacity=settings.TELEGRAM_RATE_BURST,
+        )
+        self._chat_rate_limiters: dict[int, RedisTokenBucket] = {}
+        self._semaphore = asyncio.Semaphore(settings.TELEGRAM_SEND_CONCURRENCY)
+
+    def _chat_rate_limiter(self, chat_id: int) -> RedisTokenBucket:
+        limiter = self._chat_rate_limiters.get(chat_id)
+
+        if limiter is None:
+            # group and channel ids are negative
+            is_group = chat_id < 0
+            limiter = RedisTokenBucket(
+                key=f"telegram:{chat_id}",
+                rate=settings.TELEGRAM_GROUP_RATE_LIMIT if is_group else settings.TELEGRAM_CHAT_RATE_LIMIT,
+                capacity=settings.TELEGRAM_GROUP_RATE_BURST if is_group else settings.TELEGRAM_CHAT_RATE_BURST,
+            )
+            self._chat_rate_limiters[chat_id] = limiter
+
+        return limiter
+
+    async def _send(self, chat_id: int, send: Callable[[], Awaitable[Message]]) -> DeliveryResult:
+        chat_limiter = self._chat_rate_limiter(chat_id)
+        result = DeliveryResult(chat_id=chat_id, success=False)
+
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            await chat_limiter.acquire()
+            await self.rate_limiter.acquire()
+
+            try:
+                message = await send()
+            except TelegramRetryAfter as e:
+                result.error = str(e)
+                logger.warning(f"Telegram asked to retry chat {chat_id} after {e.retry_after}s")
+                # the wait is enforced by the chat limiter on the next acquire
+                await chat_limiter.penalize(e.retry_after)
+                continue
+            except (TelegramNetworkError, TelegramServerError) as e:
+                result.error = str(e)
+                await asyncio.sleep(min(2 ** attempt, 30) + random.uniform(0, 1))
+                continue
+            except TelegramAPIError as e:
+                # bad request, bot kicked or blocked: retrying won't help
+                result.error = str(e)
+                break
+
+            result.success = True
+            result.message_id = message.message_id
+            result.file_id = message.document.file_id if message.document else None
+            result.error = None
+            return result
+
+        logger.error(f"❌ Failed to deliver to chat {chat_id} after {result.attempts} attempts: {result.error}")
+        return result
+
+    async def _send_to_chat(self, chat_id: int, sends: list[Callable[[], Awaitable[Message]]]) -> list[DeliveryResult]:
+        # messages to one chat go out in order, different chats run concurrently
+        async with self._semaphore:
+            return [await self._send(chat_id, send) for send in sends]
+
+    async def send_messages(
+            self,
+            chat_ids: list[int],
+            texts: list[str],
+            parse_mode: Optional[str] = "HTML",
+    ) -> list[DeliveryResult]:
+        """Send every text to every chat, one result per chat and text."""
+        def sends_for(chat_id: int) -> list[Callable[[], Awaitable[Message]]]:
+            return [
+                lambda text=text: self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                for text in texts
+            ]
+
+        per_chat = await asyncio.gather(*(self._send_to_chat(chat_id, sends_for(chat_id)) for chat_id in chat_ids))
+        return [result for results in per_chat for result in results]
+
+    async def send_message(self, chat_ids: list[int], text: str, parse_mode: Optional[str] = "HTML") -> list[DeliveryResult]:
+        return await self.send_messages(chat_ids, [text], parse_mode=parse_mode)
+
+    async def send_document(
+            self,
+            chat_ids: list[int],
+            document: InputFile | str,
+            caption: Optional[str] = None,
+            parse_mode: Optional[str] = "HTML",
+    ) -> list[DeliveryResult]:
+        def send_for(chat_id: int) -> Callable[[], Awaitable[Message]]:
+            return lambda: self.bot.send_document(
+                chat_id=chat_id,
+                document=document,
+                caption=caption,
+                parse_mode=parse_mode,
+            )
+
+        per_chat = await asyncio.gather(*(self._send_to_chat(chat_id, [send_for(chat_id)]) for chat_id in chat_ids))
+        return [result for results in per_chat for result in results]
+
+    async def send_file(
+            self,
+            chat_ids: list[int],
+            file_bytes: bytes,
+            filename: str,
+            caption: Optional[str] = None,
+            parse_mode: Optional[str] = "HTML",
+    ) -> list[DeliveryResult]:
+        """
+        Upload the file once and send the rest by its Telegram file_id.
+
+        The file_id is cached in Redis by the file's sha256, so re-sends and
+        retries of the same report don't upload it again.
+        """
+        cache_key = f"telegram:file_id:{hashlib.sha256(file_bytes).hexdigest()}"
+        file_id = await self._get_cached_file_id(cache_key)
+        remaining = list(chat_ids)
+        results = []
+
+        if file_id is not None and remaining:
+            result = (await self.send_document(remaining[:1], file_id, caption, parse_mode))[0]
+            if result.success:
+                results.append(result)
+                remaining.pop(0)
+            else:
+                logger.warning(f"Cached file_id for {filename} was rejected, uploading it again: {result.error}")
+                await self._forget_file_id(cache_key)
+                file_id = None
+
+        # upload to one chat at a time until Telegram has the file
+        while file_id is None and remaining:
+            chat_id = remaining.pop(0)
+            result = (await self.send_document(
+                [chat_id], BufferedInputFile(file=file_bytes, filename=filename), caption, parse_mode
+            ))[0]
+            results.append(result)
+
+            if result.success and result.file_id:
+                file_id = result.file_id
+                await self._cache_file_id(cache_key, file_id)
+
+        if remaining:
+            results.extend(await self.send_document(remaining, file_id, caption, parse_mode))
+
+        return results
+
+    @staticmethod
+    async def _get_cached_file_id(key: str) -> Optional[str]:
+        try:
+            return await get_async_redis_client().get(key)
+        except (redis.RedisError, ConnectionError) as e:
+            logger.warning(f"Failed to read cached file_id {key}: {e}")
+            return None
+
+    @staticmethod
+    async def _cache_file_id(key: str, file_id: str) -> None:
+        try:
+            await get_async_redis_client().set(key, file_id, ex=settings.TELEGRAM_FILE_ID_TTL)
+        except (redis.RedisError, ConnectionError) as e:
+            logger.warning(f"Failed to cache file_id {key}: {e}")
+
+    @staticmethod
+    async def _forget_file_id(key: str) -> None:
+        try:
+            await get_async_redis_client().delete(key)
+        except (redis.RedisError, ConnectionError) as e:
+            logger.warning(f"Failed to delete cached file_id {key}: {e}")
+
+
+__all__ = [
+    "DeliveryResult",
+    "TelegramDelivery",
+]
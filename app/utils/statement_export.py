@@ -0,0 +1,181 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import BinaryIO, Iterator
+from zoneinfo import ZoneInfo
+
+from openpyxl import Workbook
+from sqlalchemy.orm import Session
+
+from app.core.configs import settings
+from app.models import BankAccount
+from app.repo import TransactionRepository
+from app.utils.consts import BankTypesMapping
+from app.utils.transaction_excel import (
+    TRANSACTION_HEADERS,
+    AccountStatement,
+    StatementRow,
+    build_statement_row,
+    compute_balances,
+)
+
+STATEMENT_FORMATS = ("xlsx", "csv")
+
+STATEMENT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+STREAM_BATCH_SIZE = 1000
+
+
+def _period_bounds(date_from: date, date_to: date) -> tuple[datetime, datetime]:
+    """Both dates are inclusive local days, the upper bound is exclusive."""
+    timezone = ZoneInfo(settings.TIMEZONE)
+    start = datetime.combine(date_from, time.min, tzinfo=timezone)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone)
+    return start, end
+
+
+def _account_statement(
+        repo: TransactionRepository,
+        bank_account: BankAccount,
+        start: datetime,
+        end: datetime
+) -> AccountStatement:
+    """Balances of the period; rows are streamed separately."""
+    account_number = bank_account.account_number
+    period_income, period_outcome = repo.get_account_turnover(account_number, start, end)
+    later_income, later_outcome = repo.get_account_turnover(account_number, end)
+
+    opening_balance, closing_balance = compute_balances(
+        float(bank_account.balance),
+        period_income=float(period_income),
+        period_outcome=float(period_outcome),
+        later_income=float(later_income),
+        later_outcome=float(later_outcome),
+    )
+
+    return AccountStatement(
+        bank_name=BankTypesMapping.get(bank_account.bank_type),
+        account_number=account_number,
+        opening_balance=opening_balance,
+        closing_balance=closing_balance,
+    )
+
+
+def _iter_rows(
+        repo: TransactionRepository,
+        account_number: str,
+        start: datetime,
+        end: datetime
+) -> Iterator[StatementRow]:
+    for transaction in repo.stream_by_account(account_number, start, end, batch_size=STREAM_BATCH_SIZE):
+        yield build_statement_row(transaction, account_number)
+
+
+def _statement_header(company_name: str, statement: AccountStatement, date_from: date, date_to: date) -> list[list]:
+    return [
+        [f"Выписка лицевых счетов за {date_from:%d.%m.%Y} - {date_to:%d.%m.%Y}"],
+        [f"Банк: {statement.bank_name}", f"№ счёта: {statement.account_number}"],
+        [f"Наименование счёта: {company_name}"],
+        ["Остаток: Начало", round(statement.opening_balance, 2)],
+        ["Остаток: Конец", round(statement.closing_balance, 2)],
+        [],
+        list(TRANSACTION_HEADERS),
+    ]
+
+
+def _row_values(idx: int, row: StatementRow) -> list:
+    return [
+        idx,
+        row.document_date,
+        row.payment_number,
+        row.counterparty_name,
+        row.counterparty_account,
+        row.counterparty_mfo,
+        row.debit,
+        row.credit,
+        row.description,
+    ]
+
+
+def statement_filename(company_name: str, date_from: date, date_to: date, file_format: str) -> str:
+    return f"{company_name}_{date_from:%Y%m%d}_{date_to:%Y%m%d}_statement.{file_format}"
+
+
+def write_statement_xlsx(
+        db: Session,
+        company_name: str,
+        bank_accounts: list[BankAccount],
+        date_from: date,
+        date_to: date,
+        output: BinaryIO
+) -> None:
+    """
+    One sheet per account. The write-only workbook streams rows to disk as
+    they are appended, so memory stays flat however long the period is.
+    """
+    repo = TransactionRepository(db)
+    start, end = _period_bounds(date_from, date_to)
+    workbook = Workbook(write_only=True)
+
+    for bank_account in bank_accounts:
+        statement = _account_statement(repo, bank_account, start, end)
+        sheet = workbook.create_sheet(title=bank_account.account_number[:31])
+
+        for line in _statement_header(company_name, statement, date_from, date_to):
+            sheet.append(line)
+
+        for idx, row in enumerate(_iter_rows(repo, bank_account.account_number, start, end), start=1):
+            sheet.append(_row_values(idx, row))
+
+    if not bank_accounts:
+        workbook.create_sheet()
+
+    workbook.save(output)
+
+
+def iter_statement_csv(
+        db: Session,
+        company_name: str,
+        bank_accounts: list[BankAccount],
+        date_from: date,
+        date_to: date
+) -> Iterator[str]:
+    """CSV lines, one section per account; the BOM makes Excel read it as UTF-8."""
+    repo = TransactionRepository(db)
+    start, end = _period_bounds(date_from, date_to)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield "\ufeff"
+
+    for section, bank_account in enumerate(bank_accounts):
+        if section:
+            writer.writerow([])
+
+        statement = _account_statement(repo, bank_account, start, end)
+        writer.writerows(_statement_header(company_name, statement, date_from, date_to))
+        yield flush()
+
+        for idx, row in enumerate(_iter_rows(repo, bank_account.account_number, start, end), start=1):
+            values = _row_values(idx, row)
+            values[1] = row.document_date.strftime("%d.%m.%Y") if row.document_date else ""
+            writer.writerow(values)
+            yield flush()
+
+
+__all__ = [
+    "STATEMENT_FORMATS",
+    "STATEMENT_MEDIA_TYPES",
+    "statement_filename",
+    "write_statement_xlsx",
+    "iter_statement_csv",
+]
@@ -1,344 +1,376 @@
 import logging
-
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-from app.utils import BankTypesMapping
-
-logger = logging.getLogger(__name__)
-
-try:
-    pdfmetrics.registerFont(TTFont('DejaVuSans', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'))
-    FONT_NAME = 'DejaVuSans'
-    FONT_NAME_BOLD = 'DejaVuSans-Bold'
-except Exception as e:
-    logger.warning(f"Could not load DejaVuSans fonts: {e}, using Helvetica")
-    FONT_NAME = 'Helvetica'
-    FONT_NAME_BOLD = 'Helvetica-Bold'
-
-import logging
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta  # noqa
+from io import BytesIO
 from pathlib import Path
+from typing import Optional
 from zoneinfo import ZoneInfo
 
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from PyPDF2 import PdfMerger
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from sqlalchemy.orm import Session
 
 from app.core.configs import settings
+from app.core.process_pool import run_cpu_bound
 from app.models import BankAccount, Transaction
 from app.repo import TransactionRepository
+from app.utils.consts import BankTypesMapping
 
 logger = logging.getLogger(__name__)
 
-try:
-    pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
-    FONT_NAME = 'DejaVuSans'
-    FONT_NAME_BOLD = 'DejaVuSans-Bold'
-except:
-    FONT_NAME = 'Helvetica'
-    FONT_NAME_BOLD = 'Helvetica-Bold'
-    logger.warning("Could not load DejaVuSans fonts, using Helvetica")
+CELL_FONT_SIZE = 8
+CELL_PADDING = 3
+
+TRANSACTION_COLUMN_WIDTHS = (
+    15 * mm,
+    22 * mm,
+    20 * mm,
+    45 * mm,
+    35 * mm,
+    15 * mm,
+    25 * mm,
+    25 * mm,
+    65 * mm,
+)
+
+TRANSACTION_HEADERS = (
+    "№ пп",
+    "Дата документа",
+    "№ док.",
+    "Наименование счёта",
+    "№ счёта",
+    "МФО",
+    "Обороты по дебету",
+    "Обороты по кредиту",
+    "Назначение платежа",
+)
+
+
+def _register_fonts() -> tuple[str, str]:
+    font_dir = Path(settings.REPORT_FONT_DIR)
+    candidates = [font_dir / "DejaVuSans.ttf", font_dir / "DejaVuSans-Bold.ttf"]
+
+    if not all(path.is_file() for path in candidates):
+        # bare file names are looked up on ReportLab's own font search path
+        candidates = [Path("DejaVuSans.ttf"), Path("DejaVuSans-Bold.ttf")]
+
+    try:
+        pdfmetrics.registerFont(TTFont("DejaVuSans", str(candidates[0])))
+        pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", str(candidates[1])))
+        return "DejaVuSans", "DejaVuSans-Bold"
+    except Exception as e:
+        logger.warning(f"Could not load DejaVuSans fonts from {font_dir}: {e}, using Helvetica")
+        return "Helvetica", "Helvetica-Bold"
+
+
+@dataclass(frozen=True)
+class ReportStyles:
+    font_name: str
+    font_name_bold: str
+    title: ParagraphStyle
+    normal: ParagraphStyle
+    header: ParagraphStyle
+    cell: ParagraphStyle
+    info_table: TableStyle
+    transaction_table: TableStyle
+
+
+_report_styles: Optional[ReportStyles] = None
+
+
+def get_report_styles() -> ReportStyles:
+    """Fonts and styles are built once per process and shared by every report."""
+    global _report_styles
+
+    if _report_styles is not None:
+        return _report_styles
+
+    font_name, font_name_bold = _register_fonts()
+    styles = getSampleStyleSheet()
+
+    _report_styles = ReportStyles(
+        font_name=font_name,
+        font_name_bold=font_name_bold,
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=font_name_bold,
+            fontSize=14,
+            alignment=TA_CENTER,
+            spaceAfter=12
+        ),
+        normal=ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=9,
+            alignment=TA_LEFT
+        ),
+        header=ParagraphStyle(
+            'CustomHeader',
+            parent=styles['Normal'],
+            fontName=font_name_bold,
+            fontSize=CELL_FONT_SIZE,
+            alignment=TA_CENTER
+        ),
+        cell=ParagraphStyle(
+            'CustomCell',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=CELL_FONT_SIZE,
+            alignment=TA_CENTER,
+            wordWrap='CJK'
+        ),
+        info_table=TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), font_name),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ]),
+        transaction_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E0E0E0')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('FONTNAME', (0, 0), (-1, 0), font_name_bold),
+            ('FONTSIZE', (0, 0), (-1, 0), CELL_FONT_SIZE),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+
+            ('FONTNAME', (0, 1), (-1, -1), font_name),
+            ('FONTSIZE', (0, 1), (-1, -1), CELL_FONT_SIZE),
+            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+            ('ALIGN', (6, 1), (7, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('BOX', (0, 0), (-1, -1), 1, colors.black),
+
+            ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ]),
+    )
+
+    return _report_styles
+
+
+@dataclass(frozen=True)
+class StatementRow:
+    document_date: Optional[date]
+    payment_number: str
+    counterparty_name: str
+    counterparty_account: str
+    counterparty_mfo: str
+    debit: float
+    credit: float
+    description: str
+
+
+@dataclass(frozen=True)
+class AccountStatement:
+    bank_name: str
+    account_number: str
+    opening_balance: float
+    closing_balance: float
+    rows: list[StatementRow] = field(default_factory=list)
+
+
+def build_statement_row(transaction: Transaction, account_number: str) -> StatementRow:
+    is_income = transaction.receiver_account == account_number
+    amount = float(transaction.payment_amount)
+
+    if is_income:
+        return StatementRow(
+            document_date=transaction.document_date.date() if transaction.document_date else None,
+            payment_number=transaction.payment_number or "",
+            counterparty_name=transaction.sender_name or "",
+            counterparty_account=transaction.sender_account or "",
+            counterparty_mfo=transaction.sender_bank_code or "",
+            debit=amount,
+            credit=0.0,
+            description=transaction.payment_description or "",
+        )
+
+    return StatementRow(
+        document_date=transaction.document_date.date() if transaction.document_date else None,
+        payment_number=transaction.payment_number or "",
+        counterparty_name=transaction.receiver_name or "",
+        counterparty_account=transaction.receiver_account or "",
+        counterparty_mfo=transaction.receiver_bank_code or "",
+        debit=0.0,
+        credit=amount,
+        description=transaction.payment_description or "",
+    )
+
+
+def compute_balances(
+        current_balance: float,
+        period_income: float,
+        period_outcome: float,
+        later_income: float = 0.0,
+        later_outcome: float = 0.0,
+) -> tuple[float, float]:
+    """
+    Opening and closing balance of a period, walked back from the current
+    balance through everything that happened after the period and in it.
+    """
+    closing_balance = current_balance - later_income + later_outcome
+    opening_balance = closing_balance - period_income + period_outcome
+    return opening_balance, closing_balance
+
+
+def build_account_statement(
+        bank_account: BankAccount,
+        transactions: list[Transaction],
+        bank_name: str
+) -> AccountStatement:
+    account_number = bank_account.account_number
+    rows = [build_statement_row(transaction, account_number) for transaction in transactions]
+
+    # the report covers everything up to now, so the current balance is the closing one
+    opening_balance, closing_balance = compute_balances(
+        float(bank_account.balance),
+        period_income=sum(row.debit for row in rows),
+        period_outcome=sum(row.credit for row in rows),
+    )
+
+    return AccountStatement(
+        bank_name=bank_name,
+        account_number=account_number,
+        opening_balance=opening_balance,
+        closing_balance=closing_balance,
+        rows=rows,
+    )
 
 
 async def handle_daily_report(
         company_name: str,
         bank_accounts: list[BankAccount],
         db: Session
-) -> tuple[str, bytes, str] | None:
+) -> tuple[bytes, str] | None:
     timezone = ZoneInfo(settings.TIMEZONE)
     now = datetime.now(timezone)
     date_from = now.replace(hour=9, minute=0, second=0, microsecond=0)
     # date_from = now - timedelta(days=7)
     transaction_repo = TransactionRepository(db)
-    pdf_paths = []
+    # by account number: transfers stored by the counterparty's sync belong to both reports
+    company_transactions = transaction_repo.get_by_accounts(
+        [bank_account.account_number for bank_account in bank_accounts],
+        date_from=date_from
+    )
+
+    statements = []
     for bank_account in bank_accounts:
-        transactions = transaction_repo.get_by_account(
-            bank_account.account_number,
-            date_from=date_from
-        )
-        bank_name = BankTypesMapping.get(bank_account.bank_type)
+        transactions = [
+            transaction for transaction in company_transactions
+            if bank_account.account_number in (transaction.sender_account, transaction.receiver_account)
+        ]
         if transactions:
-            pdf_path = await _generate_pdf(
-                company_name,
-                bank_account,
-                transactions,
-                current_date=date_from.date(),
-                bank_name=bank_name
-            )
-            if pdf_path:
-                pdf_paths.append(pdf_path)
-
-    if pdf_paths:
-        filepath, pdf_bytes = await _merge_pdfs(pdf_paths, company_name, date_from.date())
-        filename = Path(filepath).name
+            bank_name = BankTypesMapping.get(bank_account.bank_type)
+            statements.append(build_account_statement(bank_account, transactions, bank_name))
 
-        for pdf_path in pdf_paths:
-            try:
-                Path(pdf_path).unlink()
-            except Exception as e:
-                logger.error(f"Failed to delete temporary PDF {pdf_path}: {e}")
+    if not statements:
+        return None
 
-        return filepath, pdf_bytes, filename
+    pdf_bytes = await run_cpu_bound(render_daily_report, company_name, statements, date_from.date())
+    formatted_date = date_from.strftime("%Y%m%d")
+    filename = f"{company_name}_{formatted_date}_kapital_transactions.pdf"
 
-    return None
+    logger.info(f"Generated daily report {filename} ({len(pdf_bytes)} bytes)")
+    return pdf_bytes, filename
 
 
-async def _generate_pdf(
-        company_name: str,
-        bank_account: BankAccount,
-        transactions: list[Transaction],
-        current_date: date,
-        bank_name: str
-) -> str:
-    if not transactions:
-        return None
+def render_daily_report(company_name: str, statements: list[AccountStatement], current_date: date) -> bytes:
+    """Render one statement per account, each starting on a new page."""
+    story = []
+    for statement in statements:
+        if story:
+            story.append(PageBreak())
+        story.extend(_generate_pdf_parts(company_name, statement, current_date))
 
-    output_dir = Path("reports/daily")
-    output_dir.mkdir(parents=True, exist_ok=True)
+    return _build_pdf(story)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    formated_company_name = company_name.replace(" ", "_")
-    filename = f"{formated_company_name}_{bank_account.account_number}_{timestamp}_temp.pdf"
-    filepath = output_dir / filename
 
+def _build_pdf(story: list) -> bytes:
+    buffer = BytesIO()
     doc = SimpleDocTemplate(
-        str(filepath),
+        buffer,
         pagesize=landscape(A4),
         rightMargin=10 * mm,
         leftMargin=10 * mm,
         topMargin=15 * mm,
         bottomMargin=15 * mm
     )
+    doc.build(story)
+    return buffer.getvalue()
 
-    story = []
-    elements = await _generate_pdf_parts(
-        company_name,
-        bank_account,
-        transactions,
-        current_date,
-        bank_name
-    )
-
-    if elements:
-        story.extend(elements)
-        doc.build(story)
-        return str(filepath)
 
-    return None
+def _cell(text: str, column: int, styles: ReportStyles):
+    """
+    Plain strings are drawn directly by the table and are much cheaper than a
+    Paragraph, so only text that would not fit on one line gets wrapped.
+    """
+    width = TRANSACTION_COLUMN_WIDTHS[column] - 2 * CELL_PADDING
+    if pdfmetrics.stringWidth(text, styles.font_name, CELL_FONT_SIZE) <= width:
+        return text
+    return Paragraph(text, styles.cell)
 
 
-async def _generate_pdf_parts(
+def _generate_pdf_parts(
         company_name: str,
-        bank_account: BankAccount,
-        transactions: list[Transaction],
+        statement: AccountStatement,
         current_date: date,
-        bank_name: str
 ):
-    account_number = bank_account.account_number
-    current_amount = float(bank_account.balance)
-
-    income_transactions = [
-        t for t in transactions
-        if t.receiver_account == account_number
-    ]
-    income_for_period = sum(
-        float(t.payment_amount) for t in income_transactions
-    )
-
-    outcome_transactions = [
-        t for t in transactions
-        if t.sender_account == account_number
-    ]
-    outcome_for_period = sum(
-        float(t.payment_amount) for t in outcome_transactions
-    )
-
-    opening_balance = current_amount - income_for_period + outcome_for_period
-
+    styles = get_report_styles()
     formatted_date = current_date.strftime("%d.%m.%Y")
 
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontName=FONT_NAME_BOLD,
-        fontSize=14,
-        alignment=TA_CENTER,
-        spaceAfter=12
-    )
-
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontName=FONT_NAME,
-        fontSize=9,
-        alignment=TA_LEFT
-    )
-
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_BOLD,
-        fontSize=8,
-        alignment=TA_CENTER
-    )
-
-    cell_style = ParagraphStyle(
-        'CustomCell',
-        parent=styles['Normal'],
-        fontName=FONT_NAME,
-        fontSize=8,
-        alignment=TA_CENTER,
-        wordWrap='CJK'
-    )
-
-    story = []
-
-    title = Paragraph(f"Выписка лицевых счетов за {formatted_date}", title_style)
-    story.append(title)
-    story.append(Spacer(1, 5 * mm))
+    story = [
+        Paragraph(f"Выписка лицевых счетов за {formatted_date}", styles.title),
+        Spacer(1, 5 * mm),
+    ]
 
     info_data = [
-        [Paragraph(f"Дата: {current_date.strftime('%d.%m.%Y')}", normal_style), ""],
-        [Paragraph(f"Банк: {bank_name}", normal_style), Paragraph(f"№ счёта: {account_number}", normal_style)],
-        [Paragraph(f"Наименование счёта: {company_name}", normal_style), ],
+        [Paragraph(f"Дата: {formatted_date}", styles.normal), ""],
+        [
+            Paragraph(f"Банк: {statement.bank_name}", styles.normal),
+            Paragraph(f"№ счёта: {statement.account_number}", styles.normal)
+        ],
+        [Paragraph(f"Наименование счёта: {company_name}", styles.normal), ],
         [
-            Paragraph(f"Остаток: Начало {opening_balance:,.2f}", normal_style),
-            Paragraph(f"Остаток: Конец дня {current_amount:,.2f}", normal_style)
+            Paragraph(f"Остаток: Начало {statement.opening_balance:,.2f}", styles.normal),
+            Paragraph(f"Остаток: Конец дня {statement.closing_balance:,.2f}", styles.normal)
         ]
     ]
 
     info_table = Table(info_data, colWidths=[140 * mm, 120 * mm])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), FONT_NAME),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-    ]))
+    info_table.setStyle(styles.info_table)
 
     story.append(info_table)
     story.append(Spacer(1, 5 * mm))
 
-    headers = [
-        Paragraph("№ пп", header_style),
-        Paragraph("Дата документа", header_style),
-        Paragraph("№ док.", header_style),
-        Paragraph("Наименование счёта", header_style),
-        Paragraph("№ счёта", header_style),
-        Paragraph("МФО", header_style),
-        Paragraph("Обороты по дебету", header_style),
-        Paragraph("Обороты по кредиту", header_style),
-        Paragraph("Назначение платежа", header_style),
-    ]
-
-    table_data = [headers]
-
-    for idx, transaction in enumerate(transactions, start=1):
-
-        is_income = transaction.receiver_account == account_number
-
-        if is_income:
-            counterparty_name = transaction.sender_name or ""
-            counterparty_account = transaction.sender_account or ""
-            counterparty_mfo = transaction.sender_bank_code or ""
-            debit = float(transaction.payment_amount)
-            credit = 0.0
-        else:
-            counterparty_name = transaction.receiver_name or ""
-            counterparty_account = transaction.receiver_account or ""
-            counterparty_mfo = transaction.receiver_bank_code or ""
-            debit = 0.0
-            credit = float(transaction.payment_amount)
-
-        doc_date = transaction.document_date.strftime("%d.%m.%Y") if transaction.document_date else ""
-
-        row = [
-            Paragraph(str(idx), cell_style),
-            Paragraph(doc_date, cell_style),
-            Paragraph(transaction.payment_number or "", cell_style),
-            Paragraph(counterparty_name, cell_style),
-            Paragraph(counterparty_account, cell_style),
-            Paragraph(counterparty_mfo, cell_style),
-            Paragraph(f"{debit:,.2f}" if debit > 0 else "0,00", cell_style),
-            Paragraph(f"{credit:,.2f}" if credit > 0 else "0,00", cell_style),
-            Paragraph(transaction.payment_description or "", cell_style),
-        ]
-
-        table_data.append(row)
-
-    col_widths = [
-        15 * mm,
-        22 * mm,
-        20 * mm,
-        45 * mm,
-        35 * mm,
-        15 * mm,
-        25 * mm,
-        25 * mm,
-        65 * mm,
-    ]
-
-    trans_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-
-    table_style = TableStyle([
-
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E0E0E0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), FONT_NAME_BOLD),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-
-        ('FONTNAME', (0, 1), (-1, -1), FONT_NAME),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-        ('ALIGN', (6, 1), (7, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-    ])
-
-    trans_table.setStyle(table_style)
+    table_data = [[Paragraph(header, styles.header) for header in TRANSACTION_HEADERS]]
+
+    for idx, row in enumerate(statement.rows, start=1):
+        table_data.append([
+            str(idx),
+            row.document_date.strftime("%d.%m.%Y") if row.document_date else "",
+            _cell(row.payment_number, 2, styles),
+            Paragraph(row.counterparty_name, styles.cell),
+            _cell(row.counterparty_account, 4, styles),
+            _cell(row.counterparty_mfo, 5, styles),
+            _cell(f"{row.debit:,.2f}" if row.debit > 0 else "0,00", 6, styles),
+            _cell(f"{row.credit:,.2f}" if row.credit > 0 else "0,00", 7, styles),
+            Paragraph(row.description, styles.cell),
+        ])
+
+    trans_table = Table(table_data, colWidths=list(TRANSACTION_COLUMN_WIDTHS), repeatRows=1)
+    trans_table.setStyle(styles.transaction_table)
     story.append(trans_table)
 
     return story
-
-
-async def _merge_pdfs(pdf_paths: list[str], company_name: str, report_date: date) -> tuple[str, bytes]:
-    output_dir = Path("reports/daily")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    formatted_date = report_date.strftime("%Y%m%d")
-    filename = f"{company_name}_{formatted_date}_kapital_transactions.pdf"
-    filepath = output_dir / filename
-
-    merger = PdfMerger()
-
-    for pdf_path in pdf_paths:
-        merger.append(pdf_path)
-
-    merger.write(str(filepath))
-    merger.close()
-
-    with open(filepath, 'rb') as f:
-        pdf_bytes = f.read()
-
-    logger.info(f"Generated merged daily report: {filepath}")
-    return str(filepath), pdf_bytes
@@ -477,6 +477,20 @@ invalid_language = {
     "uz_latn": "❌ Noto'g'ri til tanlandi",
     "uz_cy": "❌ Нотўғри тил танланди"
 }
+statement_usage = {
+    "en": "ℹ️ Usage: /statement [days] [xlsx|csv], for example /statement 30 csv (up to {max_days} days)",
+    "ru": "ℹ️ Использование: /statement [дни] [xlsx|csv], например /statement 30 csv (не более {max_days} дней)",
+    "uz_latn": "ℹ️ Foydalanish: /statement [kunlar] [xlsx|csv], masalan /statement 30 csv ({max_days} kungacha)",
+    "uz_cy": "ℹ️ Фойдаланиш: /statement [кунлар] [xlsx|csv], масалан /statement 30 csv ({max_days} кунгача)"
+}
+
+statement_caption = {
+    "en": "📊 <b>Statement</b>\n🏢 {company}\n📅 {date_from} - {date_to}",
+    "ru": "📊 <b>Выписка</b>\n🏢 {company}\n📅 {date_from} - {date_to}",
+    "uz_latn": "📊 <b>Ko'chirma</b>\n🏢 {company}\n📅 {date_from} - {date_to}",
+    "uz_cy": "📊 <b>Кўчирма</b>\n🏢 {company}\n📅 {date_from} - {date_to}"
+}
+
 
 MESSAGES = {
     "general_error": general_error,
@@ -523,6 +537,8 @@ MESSAGES = {
     "user_text": user_text,
     "group_text": group_text,
     "invalid_role": invalid_role,
+    "statement_usage": statement_usage,
+    "statement_caption": statement_caption,
     "choose_language": choose_language,
     "language_changed": language_changed,
     "language_changed_short": language_changed_short,
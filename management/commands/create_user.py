@@ -2,8 +2,9 @@ import click
 from sqlalchemy.orm import Session
 
 from app.admin import AdminUser
-from app.db import SessionLocal
+from app.db import SessionLocal, engine
 from app.utils import hash_password
+from management.commands.schema import prepare_schema as run_prepare_schema
 
 
 @click.group()
@@ -39,5 +40,89 @@ def create_admin(email: str, password: str):
         db.close()
 
 
+@cli.command()
+def prepare_schema():
+    """Run data fixes required before applying migrations"""
+    run_prepare_schema(engine)
+    click.echo(click.style("✅ Schema is ready for migrations", fg='green'))
+
+
+@cli.command()
+def ensure_partitions():
+    """Create missing table partitions"""
+    from app.core.tasks.partition_tasks import maintain_partitions
+
+    result = maintain_partitions()
+    click.echo(click.style(f"✅ Partitions are ready, created: {len(result['created'])}", fg='green'))
+
+
+@cli.command()
+@click.option('--rows', default=500, show_default=True, help='Transactions per account')
+@click.option('--accounts', default=1, show_default=True, help='Accounts in the report')
+@click.option('--repeat', default=3, show_default=True, help='Number of renders to average')
+def benchmark_report(rows: int, accounts: int, repeat: int):
+    """Measure daily report render cost per transaction row"""
+    import time
+    from datetime import date
+
+    from app.utils.transaction_excel import AccountStatement, StatementRow, get_report_styles, render_daily_report
+
+    statement_rows = [
+        StatementRow(
+            document_date=date.today(),
+            payment_number=str(100000 + idx),
+            counterparty_name=f"ООО Контрагент {idx}",
+            counterparty_account="20208000900123456001",
+            counterparty_mfo="00974",
+            debit=1234567.89 if idx % 2 else 0.0,
+            credit=0.0 if idx % 2 else 7654321.01,
+            description="Оплата за товары по договору № 15 от 01.01.2025 г., в т.ч. НДС 12%",
+        )
+        for idx in range(rows)
+    ]
+    statements = [
+        AccountStatement(
+            bank_name="Kapitalbank",
+            account_number=f"2020800090012345{account:04d}",
+            opening_balance=1000000.0,
+            closing_balance=1000000.0,
+            rows=statement_rows,
+        )
+        for account in range(accounts)
+    ]
+
+    # fonts and styles are built once per process, keep that out of the timing
+    get_report_styles()
+
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(render_daily_report("Benchmark", statements, date.today()))
+        timings.append(time.perf_counter() - started)
+
+    average = sum(timings) / len(timings)
+    total_rows = rows * accounts
+    click.echo(
+        f"{total_rows} rows, {size / 1024:.0f} KiB: "
+        f"{average * 1000:.1f} ms per report, {average / total_rows * 1000:.3f} ms per row "
+        f"(best {min(timings) * 1000:.1f} ms)"
+    )
+
+
+@cli.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8081, show_default=True)
+@click.option('--latency', default=0.0, show_default=True, help='Seconds added to every response')
+@click.option('--retry-after-rate', default=0.0, show_default=True, help='Share of sends answered with 429')
+@click.option('--retry-after', default=1, show_default=True, help='Seconds to wait after a 429')
+def fake_telegram(host: str, port: int, latency: float, retry_after_rate: float, retry_after: int):
+    """Run a stand-in Telegram Bot API server for local runs and benchmarks"""
+    from management.commands.fake_telegram import run
+
+    click.echo(f"Set TELEGRAM_API_SERVER=http://{host}:{port} to use it, stats are at /stats")
+    run(host, port, latency, retry_after_rate, retry_after)
+
+
 if __name__ == '__main__':
     cli()
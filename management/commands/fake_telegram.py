@@ -0,0 +1,101 @@
+"""
+Stand-in Bot API server for local runs and benchmarks.
+
+Point TELEGRAM_API_SERVER at it and the bot and workers talk to it instead of
+api.telegram.org. It accepts the methods the app uses, answers with minimal
+but valid objects, and can add latency and 429 responses to exercise the
+delivery rate limiting.
+"""
+import asyncio
+import itertools
+import random
+import time
+import uuid
+from collections import Counter
+
+from aiohttp import web
+
+_message_ids = itertools.count(1)
+
+
+def _chat(chat_id) -> dict:
+    chat_id = int(chat_id)
+    return {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private", "title": f"Chat {chat_id}"}
+
+
+def _message(params) -> dict:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": _chat(params.get("chat_id", 0)),
+        "text": params.get("text"),
+    }
+
+
+def _document(params) -> dict:
+    message = _message(params)
+    document = params.get("document")
+    file_id = document if isinstance(document, str) else f"fake-{uuid.uuid4().hex}"
+    message["document"] = {
+        "file_id": file_id,
+        "file_unique_id": file_id[-16:],
+        "file_name": getattr(document, "filename", None),
+    }
+    message["caption"] = params.get("caption")
+    return message
+
+
+METHODS = {
+    "getme": lambda params: {"id": 1, "is_bot": True, "first_name": "Fake bot", "username": "fake_bot"},
+    "setwebhook": lambda params: True,
+    "deletewebhook": lambda params: True,
+    "sendmessage": _message,
+    "senddocument": _document,
+}
+
+
+def create_app(latency: float = 0.0, retry_after_rate: float = 0.0, retry_after: int = 1) -> web.Application:
+    stats = Counter()
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = await request.post()
+        stats[method] += 1
+
+        if latency:
+            await asyncio.sleep(latency)
+
+        if method not in METHODS:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": f"Not Found: method {method} not supported"},
+                status=404,
+            )
+
+        if method.startswith("send") and random.random() < retry_after_rate:
+            stats["retry_after"] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }, status=429)
+
+        return web.json_response({"ok": True, "result": METHODS[method](params)})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(stats))
+
+    app = web.Application(client_max_size=50 * 1024 * 1024)
+    app.router.add_post("/bot{token}/{method}", handle)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def run(host: str, port: int, latency: float, retry_after_rate: float, retry_after: int) -> None:
+    web.run_app(create_app(latency, retry_after_rate, retry_after), host=host, port=port)
+
+
+__all__ = [
+    "create_app",
+    "run",
+]
@@ -0,0 +1,278 @@
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.configs import settings
+from app.repo.partition import PartitionManager
+
+
+def _unique_constraint_names(conn: Connection, table: str) -> set[str]:
+    return {constraint["name"] for constraint in inspect(conn).get_unique_constraints(table)}
+
+
+def _valid_index_names(conn: Connection, table: str) -> set[str]:
+    return set(conn.scalars(text("""
+        SELECT index_class.relname
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = CAST(:table AS regclass) AND pg_index.indisvalid
+    """), {"table": table}))
+
+
+def dedupe_transactions(engine: Engine) -> None:
+    """Remove duplicate payment orders before the (bank_type, transaction_id) unique constraint."""
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("transactions"):
+            return
+        if "uq_transactions_bank_transaction_id" in _unique_constraint_names(conn, "transactions"):
+            return
+
+        _delete_duplicate_transactions(conn)
+
+
+def _delete_duplicate_transactions(conn: Connection) -> None:
+    conn.execute(text("""
+        CREATE TEMPORARY TABLE transaction_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id
+        FROM (
+            SELECT id, first_value(id) OVER (PARTITION BY transaction_id ORDER BY ctid) AS keep_id
+            FROM transactions
+            WHERE transaction_id IS NOT NULL
+        ) ranked
+        WHERE id <> keep_id
+    """))
+    conn.execute(text("""
+        UPDATE transaction_users
+        SET transaction_id = duplicates.keep_id
+        FROM transaction_duplicates duplicates
+        WHERE transaction_users.transaction_id = duplicates.id
+    """))
+    deleted = conn.execute(text("""
+        DELETE FROM transactions
+        USING transaction_duplicates duplicates
+        WHERE transactions.id = duplicates.id
+    """)).rowcount
+
+    click.echo(f"✓ Removed {deleted} duplicate transactions")
+
+
+def _is_partitioned(conn: Connection, table: str) -> bool:
+    relkind = conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table})
+    return relkind == "p"
+
+
+def _create_index_concurrently(conn: Connection, name: str, table: str, columns: str, unique: bool = False) -> None:
+    if name in _valid_index_names(conn, table):
+        return
+
+    # a previously interrupted concurrent build leaves an invalid index behind
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {table} {columns}"))
+    click.echo(f"✓ Created index {name}")
+
+
+def _add_validated_check(conn: Connection, table: str, name: str, condition: str) -> None:
+    # NOT VALID + VALIDATE checks existing rows without blocking writes
+    conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}"))
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID"))
+    conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+
+def add_transaction_columns(engine: Engine) -> None:
+    """Add new columns up front so their indexes can be built concurrently."""
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("transactions"):
+            return
+
+        conn.execute(text("""
+            ALTER TABLE transactions
+                ADD COLUMN IF NOT EXISTS bank_type VARCHAR(11) NOT NULL DEFAULT 'KAPITALBANK'
+        """))
+
+
+TRANSACTION_INDEXES = {
+    "ix_transactions_sender_account_document_date": "(sender_account, document_date)",
+    "ix_transactions_receiver_account_document_date": "(receiver_account, document_date)",
+}
+
+
+def create_transaction_indexes(engine: Engine) -> None:
+    """
+    Build the lookup indexes without blocking writes; autogenerate then
+    finds them already in place.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not inspect(conn).has_table("transactions") or _is_partitioned(conn, "transactions"):
+            return
+
+        for name, columns in TRANSACTION_INDEXES.items():
+            _create_index_concurrently(conn, name, "transactions", columns)
+
+
+def _partition_by_range(
+        engine: Engine,
+        table: str,
+        column: str,
+        boundary: str,
+        primary_key: str,
+        unique_constraints: dict[str, str],
+        foreign_keys: dict[str, str],
+        indexes: dict[str, str],
+        before_switch=None,
+) -> None:
+    """
+    Turn ``table`` into a table range-partitioned on ``column``.
+
+    The existing table becomes the ``<table>_legacy`` partition covering
+    everything before ``boundary``, so no rows are copied. Its range check and
+    unique indexes are prepared without blocking writes, and the switch itself
+    is a short catalog-only transaction.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        _add_validated_check(conn, table, f"{table}_legacy_range", f"{column} < '{boundary}'")
+
+        # the partition key has to be part of every unique constraint
+        _create_index_concurrently(conn, f"{table}_legacy_pkey", table, primary_key, unique=True)
+        for name, columns in unique_constraints.items():
+            _create_index_concurrently(conn, f"{name}_legacy", table, columns, unique=True)
+
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL lock_timeout = '10s'"))
+        conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+
+        if before_switch:
+            before_switch(conn)
+
+        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey"))
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_pkey PRIMARY KEY USING INDEX {table}_legacy_pkey"
+        ))
+        for name in unique_constraints:
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}"))
+            conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name}_legacy UNIQUE USING INDEX {name}_legacy"))
+        for name in indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_legacy"))
+
+        conn.execute(text(
+            f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+        ))
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY {primary_key}"))
+        for name, columns in unique_constraints.items():
+            conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE {columns}"))
+        for name, definition in foreign_keys.items():
+            conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY {definition}"))
+        for name, columns in indexes.items():
+            conn.execute(text(f"CREATE INDEX {name} ON {table} {columns}"))
+
+        # the validated range check lets ATTACH skip scanning the legacy rows
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+        ))
+        conn.execute(text(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {table}_legacy_range"))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    click.echo(f"✓ Partitioned {table}, existing rows are in {table}_legacy (before {boundary})")
+
+
+def _partition_boundary(table: str, interval: str) -> str:
+    # leave the current and the next interval in the legacy partition
+    manager = PartitionManager(None, table, interval=interval)
+    return manager.shift(manager.interval_start(datetime.now(timezone.utc)), 2).isoformat()
+
+
+def partition_transactions(engine: Engine) -> None:
+    """Partition ``transactions`` by month on document_date."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("transactions") or _is_partitioned(conn, "transactions"):
+            return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "UPDATE transactions SET document_date = '1970-01-01 00:00:00+00' WHERE document_date IS NULL"
+        ))
+        _add_validated_check(conn, "transactions", "transactions_document_date_not_null", "document_date IS NOT NULL")
+
+    def before_switch(conn: Connection) -> None:
+        # a foreign key to a partitioned table would need the whole primary key
+        conn.execute(text("ALTER TABLE transaction_users DROP CONSTRAINT IF EXISTS transaction_users_transaction_id_fkey"))
+        conn.execute(text("ALTER TABLE transactions ALTER COLUMN document_date SET NOT NULL"))
+        conn.execute(text("ALTER TABLE transactions DROP CONSTRAINT transactions_document_date_not_null"))
+
+    _partition_by_range(
+        engine,
+        table="transactions",
+        column="document_date",
+        boundary=_partition_boundary("transactions", "month"),
+        primary_key="(id, document_date)",
+        unique_constraints={
+            "uq_transactions_bank_transaction_id": "(bank_type, transaction_id, document_date)",
+        },
+        foreign_keys={},
+        indexes=TRANSACTION_INDEXES,
+        before_switch=before_switch,
+    )
+
+
+AUDIT_LOG_INDEXES = {
+    "ix_audit_logs_created_at": "(created_at, id)",
+    "ix_audit_logs_category_created_at": "(category, created_at, id)",
+    "ix_audit_logs_action_created_at": "(action, created_at, id)",
+    "ix_audit_logs_user_id_created_at": "(user_id, created_at, id)",
+    "ix_audit_logs_admin_id_created_at": "(admin_id, created_at, id)",
+}
+
+
+def create_audit_log_indexes(engine: Engine) -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not inspect(conn).has_table("audit_logs") or _is_partitioned(conn, "audit_logs"):
+            return
+
+        for name, columns in AUDIT_LOG_INDEXES.items():
+            _create_index_concurrently(conn, name, "audit_logs", columns)
+
+
+def partition_audit_logs(engine: Engine) -> None:
+    """Partition ``audit_logs`` by AUDIT_LOG_PARTITION_INTERVAL on created_at."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("audit_logs") or _is_partitioned(conn, "audit_logs"):
+            return
+
+    _partition_by_range(
+        engine,
+        table="audit_logs",
+        column="created_at",
+        boundary=_partition_boundary("audit_logs", settings.AUDIT_LOG_PARTITION_INTERVAL),
+        primary_key="(id, created_at)",
+        unique_constraints={},
+        foreign_keys={
+            "audit_logs_admin_id_fkey": "(admin_id) REFERENCES admin_users (id) ON DELETE CASCADE",
+            "audit_logs_user_id_fkey": "(user_id) REFERENCES users (id) ON DELETE CASCADE",
+        },
+        indexes=AUDIT_LOG_INDEXES,
+    )
+
+
+# The deploy ``migrate`` script autogenerates migrations from the models, which
+# cannot move data around or build indexes concurrently. These steps run right
+# before it and must be safe to run on every deploy.
+PREPARE_STEPS = [
+    dedupe_transactions,
+    add_transaction_columns,
+    create_transaction_indexes,
+    partition_transactions,
+    create_audit_log_indexes,
+    partition_audit_logs,
+]
+
+
+def prepare_schema(engine: Engine) -> None:
+    for step in PREPARE_STEPS:
+        step(engine)
+
+
+__all__ = [
+    "prepare_schema",
+]